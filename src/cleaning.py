@@ -0,0 +1,314 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+##################################################################
+# rules
+##################################################################
+
+# value rules rewrite cells in place and report how many they changed per row, row rules
+# return a mask of the rows they'd drop. a pipeline applies every value rule as one column
+# operation and folds every row rule into a single mask, so the frame is only copied once
+
+class Fill:
+    # fills missing values with a per-column "mean", "median" or "mode", or with a constant
+    kind = "value"
+    unit = "cells"
+
+    def __init__(self, columns=None, strategy="mean"):
+        self.columns = columns
+        self.strategy = strategy
+        self.values = None
+
+    @property
+    def name(self):
+        return f"fill {', '.join(self.columns) if self.columns else 'all columns'} ({self.strategy})"
+
+    def target_columns(self, df):
+        if self.columns is not None: return list(self.columns)
+        if self.strategy in ("mean", "median"): return list(df.select_dtypes("number").columns)
+        return list(df.columns)
+
+    def fit(self, df):
+        columns = self.target_columns(df)
+        if self.strategy == "mean": values = df[columns].mean()
+        elif self.strategy == "median": values = df[columns].median()
+        elif self.strategy == "mode": values = df[columns].mode().iloc[0]
+        else: values = pd.Series(self.strategy, index=columns)
+        self.values = values.dropna().to_dict()
+
+    def apply(self, df):
+        columns = list(self.values)
+        changed = df[columns].isna().sum(axis=1).to_numpy()
+        df.fillna(self.values, inplace=True)
+        return changed
+
+class Outliers:
+    # replaces values outside [lower, upper] with the column "mean" or "median", with a
+    # constant, or clips them to the bound with replace="clip"
+    kind = "value"
+    unit = "values"
+
+    def __init__(self, column, lower=None, upper=None, replace="mean"):
+        self.column = column
+        self.lower = lower
+        self.upper = upper
+        self.replace = replace
+        self.value = None
+
+    @property
+    def name(self):
+        bounds = " and ".join(part for part in (f"< {self.lower}" if self.lower is not None else "",
+                                                f"> {self.upper}" if self.upper is not None else "") if part)
+        return f"outliers {self.column} {bounds} -> {self.replace}"
+
+    def check_column(self, df):
+        if self.column not in df.columns:
+            raise KeyError(f"'{self.name}' refers to a column that isn't in the data, which has: {', '.join(map(str, df.columns))}")
+
+    def fit(self, df):
+        self.check_column(df)
+        if self.replace == "mean": self.value = df[self.column].mean()
+        elif self.replace == "median": self.value = df[self.column].median()
+        elif self.replace != "clip": self.value = self.replace
+
+    def outside(self, values):
+        mask = np.zeros(len(values), dtype=bool)
+        if self.lower is not None: mask |= (values < self.lower).to_numpy()
+        if self.upper is not None: mask |= (values > self.upper).to_numpy()
+        return mask
+
+    def apply(self, df):
+        self.check_column(df)
+        values = df[self.column]
+        changed = self.outside(values)
+        if self.replace == "clip": df[self.column] = values.clip(self.lower, self.upper)
+        elif changed.any(): df[self.column] = values.mask(changed, self.value)
+        return changed.astype(np.int64)
+
+class Dedup:
+    # drops repeated rows, keeping the first. when streaming, rows are remembered by a 64-bit
+    # hash so a duplicate is caught even when its first copy was in an earlier chunk
+    kind = "row"
+    unit = "rows"
+
+    def __init__(self, subset=None):
+        self.subset = subset
+        self.seen = None
+
+    @property
+    def name(self):
+        return "drop duplicates" + (f" on {', '.join(self.subset)}" if self.subset else "")
+
+    def start_stream(self):
+        self.seen = set()
+
+    def drops(self, df):
+        if self.seen is None:
+            return df.duplicated(self.subset).to_numpy()
+
+        hashes = pd.util.hash_pandas_object(df[self.subset] if self.subset else df, index=False).to_numpy()
+        drop = pd.Series(hashes).duplicated().to_numpy() | np.fromiter(map(self.seen.__contains__, hashes.tolist()), dtype=bool, count=len(hashes))
+        self.seen.update(hashes[~drop].tolist())
+        return drop
+
+class DropNa:
+    # drops rows with a missing value in any of `subset` (default: any column)
+    kind = "row"
+    unit = "rows"
+
+    def __init__(self, subset=None):
+        self.subset = subset
+
+    @property
+    def name(self):
+        return "drop rows with nulls" + (f" in {', '.join(self.subset)}" if self.subset else "")
+
+    def start_stream(self):
+        pass
+
+    def drops(self, df):
+        return (df[self.subset] if self.subset else df).isna().any(axis=1).to_numpy()
+
+##################################################################
+# pipeline
+##################################################################
+
+def common_dtype(a, b):
+    # the dtype read_csv needs to parse a column that came out as `a` in one chunk and `b` in
+    # another: a wider number, or text
+    if a == b: return a
+    if a.kind in "iuf" and b.kind in "iuf": return np.result_type(a, b)
+    return np.dtype(object)
+
+def stream_dtypes(source, chunksize, **read_options):
+    # read_csv infers each chunk's dtypes on its own, so whole numbers come out as int in a
+    # chunk without gaps and as float in one with a gap. one pass works out a dtype per
+    # column that holds every chunk, to read the file again with
+    dtypes = {}
+    for chunk in pd.read_csv(source, chunksize=chunksize, **read_options):
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = common_dtype(dtypes[column], dtype) if column in dtypes else dtype
+    return dtypes
+
+class CleaningPipeline:
+    # applies the rules in the order they're declared and records, per rule, how many
+    # cells/rows it touched and how long it took
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.stats = [{"rule": rule.name, "unit": rule.unit, "affected": 0, "ms": 0.0} for rule in self.rules]
+        self.rows_in = self.null_cells = 0
+
+    def reset(self):
+        self.rows_in = self.null_cells = 0
+        for stat in self.stats:
+            stat["affected"], stat["ms"] = 0, 0.0
+
+    def clean(self, df, fit=True):
+        self.rows_in += len(df)
+        self.null_cells += int(df.isna().to_numpy().sum())
+        return self.apply(df, self.rules, self.stats, fit)
+
+    @staticmethod
+    def apply(df, rules, stats, fit):
+        keep = np.ones(len(df), dtype=bool)
+        for rule, stat in zip(rules, stats):
+            started = time.perf_counter()
+            if rule.kind == "value":
+                # a value rule declared after a row rule only sees (and counts) the rows still kept
+                if fit: rule.fit(df if keep.all() else df[keep])
+                stat["affected"] += int(rule.apply(df)[keep].sum())
+            else:
+                # row rules only see the rows earlier rules kept, as if each ran on its own
+                kept = np.flatnonzero(keep)
+                drop = np.zeros(len(df), dtype=bool)
+                drop[kept] = rule.drops(df if len(kept) == len(df) else df.iloc[kept])
+                stat["affected"] += int(drop.sum())
+                keep &= ~drop
+            stat["ms"] += (time.perf_counter() - started) * 1000
+        return df if keep.all() else df[keep]
+
+    def run(self, df):
+        self.reset()
+        return self.clean(df.copy())
+
+    def stream(self, source, chunksize=100_000, **read_options):
+        # yields the cleaned chunks of `source`. every chunk is read with the same dtypes (see
+        # stream_dtypes, unless `dtype` is given) so equal values hash and print the same in
+        # every chunk. fill and outlier statistics need the whole column, so a first pass over
+        # the raw csv computes them (means only, a median or mode can't be streamed) before
+        # the chunks are cleaned
+        self.reset()
+        if "dtype" not in read_options:
+            read_options["dtype"] = stream_dtypes(source, chunksize, **read_options)
+        self.fit_streamed(source, chunksize, **read_options)
+        for rule in self.rules:
+            if rule.kind == "row": rule.start_stream()
+
+        try:
+            for chunk in pd.read_csv(source, chunksize=chunksize, **read_options):
+                yield self.clean(chunk, fit=False)
+        finally:
+            for rule in self.rules:
+                if isinstance(rule, Dedup): rule.seen = None
+
+    def run_csv(self, source, destination, chunksize=100_000, **read_options):
+        # streams `source` to `destination`, appending each cleaned chunk
+        rows = 0
+        for i, chunk in enumerate(self.stream(source, chunksize, **read_options)):
+            chunk.to_csv(destination, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(chunk)
+        return rows
+
+    def fit_streamed(self, source, chunksize, **read_options):
+        # a mean is taken over the rows and values the rules before it leave, like run() does,
+        # so each mean rule gets its own pass over the csv with those rules applied
+        for i, rule in enumerate(self.rules):
+            if isinstance(rule, Fill) and rule.strategy in ("median", "mode") or isinstance(rule, Outliers) and rule.replace == "median":
+                raise ValueError(f"'{rule.name}' needs the whole column in memory, use run() instead")
+            if not (isinstance(rule, Fill) and rule.strategy == "mean" or isinstance(rule, Outliers) and rule.replace == "mean"):
+                if rule.kind == "value": rule.fit(pd.read_csv(source, nrows=0, **read_options))
+                continue
+
+            earlier = self.rules[:i]
+            for other in earlier:
+                if other.kind == "row": other.start_stream()
+            sums, counts = pd.Series(dtype=float), pd.Series(dtype=float)
+            for chunk in pd.read_csv(source, chunksize=chunksize, **read_options):
+                numeric = self.apply(chunk, earlier, [{"affected": 0, "ms": 0.0} for _ in earlier], fit=False).select_dtypes("number")
+                sums = sums.add(numeric.sum(), fill_value=0)
+                counts = counts.add(numeric.count(), fill_value=0)
+            column_means = (sums / counts).dropna()
+
+            if isinstance(rule, Fill): rule.values = column_means[column_means.index.intersection(rule.columns or column_means.index)].to_dict()
+            else: rule.value = column_means[rule.column]
+
+    def format_report(self):
+        lines = [f"  found {self.null_cells} null values in {self.rows_in} rows",
+                 f"  {'rule':<40} | {'affected':>14} | {'time':>10}"]
+        lines += [f"  {stat['rule']:<40.40} | {stat['affected']:>8} {stat['unit']:<5} | {stat['ms']:>7.2f} ms" for stat in self.stats]
+        return "\n".join(lines)
+
+##################################################################
+# joins
+##################################################################
+
+class HashJoin:
+    # hash index over the key columns of one side of a join, built once and then probed
+    # with each chunk of the other side. repeated keys are kept, so many-to-many joins work
+    def __init__(self, df, on):
+        self.on = list(on)
+        codes, self.keys = pd.factorize(pd.MultiIndex.from_frame(df[self.on]))
+        order = np.argsort(codes, kind='stable')
+        self.rows = df.iloc[order].reset_index(drop=True)
+        self.counts = np.bincount(codes, minlength=len(self.keys))
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def probe(self, chunk):
+        # returns matching (chunk row, indexed row) positions, in chunk order
+        codes = self.keys.get_indexer(pd.MultiIndex.from_frame(chunk[self.on]))
+        matched = np.flatnonzero(codes >= 0)
+        codes = codes[matched]
+        counts = self.counts[codes]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(matched, counts), np.repeat(self.starts[codes], counts) + offsets
+
+def join_frames(left, right, on, suffixes=("_x", "_y")):
+    # lays the matched rows out like pd.merge: keys and left columns, then the rest of the right
+    overlap = set(left.columns) & set(right.columns) - set(on)
+    right = right.drop(columns=on).rename(columns={column: column + suffixes[1] for column in overlap})
+    left = left.rename(columns={column: column + suffixes[0] for column in overlap})
+    return pd.concat([left.reset_index(drop=True), right.reset_index(drop=True)], axis=1)
+
+def stream_merge(left, right, on, destination, left_pipeline=None, right_pipeline=None, chunksize=100_000, **read_options):
+    # inner join of two csvs that never holds the larger one in memory: the smaller file is
+    # cleaned and indexed once, the larger is cleaned, probed and appended to `destination`
+    # chunk by chunk. rows come out in the streamed file's order. both sides default to
+    # dropping duplicates and rows with nulls, and each side's pipeline keeps its own report
+    left_pipeline = left_pipeline or CleaningPipeline([Dedup(), DropNa()])
+    right_pipeline = right_pipeline or CleaningPipeline([Dedup(), DropNa()])
+    stream_left = os.path.getsize(left) >= os.path.getsize(right)
+    indexed_source, indexed_pipeline = (right, right_pipeline) if stream_left else (left, left_pipeline)
+    streamed_source, streamed_pipeline = (left, left_pipeline) if stream_left else (right, right_pipeline)
+
+    indexed = pd.read_csv(indexed_source, **read_options)
+    if "dtype" not in read_options:
+        # the streamed side is read with one dtype per column (see stream_dtypes). numbers match
+        # across int and float, but a key that's text on either side is compared as text on both
+        read_options["dtype"] = stream_dtypes(streamed_source, chunksize, **read_options)
+        for column in on:
+            if common_dtype(indexed[column].dtype, read_options["dtype"][column]).kind == "O":
+                indexed[column] = indexed[column].where(indexed[column].isna(), indexed[column].astype(str))
+                read_options["dtype"][column] = np.dtype(object)
+    index = HashJoin(indexed_pipeline.run(indexed), on)
+
+    rows = 0
+    for i, chunk in enumerate(streamed_pipeline.stream(streamed_source, chunksize, **read_options)):
+        chunk_rows, index_rows = index.probe(chunk)
+        chunk, indexed = chunk.iloc[chunk_rows], index.rows.iloc[index_rows]
+        joined = join_frames(chunk, indexed, on) if stream_left else join_frames(indexed, chunk, on)
+        joined.to_csv(destination, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(joined)
+    return rows
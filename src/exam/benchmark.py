@@ -0,0 +1,228 @@
+from datetime import date, datetime, timedelta
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import main
+
+##################################################################
+# dataset generation
+##################################################################
+
+PRESETS = {
+    "tiny": (20, 1),
+    "small": (100, 5),
+    "medium": (1000, 5),
+    "large": (5000, 10),
+}
+
+def format_header_date(day, rng):
+    # the real export mixes "3/3/2023" and "13/03/2023" styles, so we do too
+    if rng.random() < 0.5: return f"{day.day}/{day.month}/{day.year}"
+    return day.strftime("%d/%m/%Y")
+
+def generate_sales_csv(filename, items, years, start=date(2020, 1, 1), seed=0):
+    # writes a wide csv in the Task4a_data.csv layout: Menu Item, Service, then one column per day
+    rng = random.Random(seed)
+    days = [start + timedelta(days=i) for i in range(round(years * 365))]
+
+    with open(filename, "w") as f:
+        f.write("Menu Item,Service," + ",".join(format_header_date(day, rng) for day in days) + "\n")
+        for service in (main.MealType.LUNCH, main.MealType.DINNER):
+            for item in range(items):
+                quantities = [str(rng.randint(3, 50)) for _ in days]
+                f.write(f"Item {item + 1:05d},{service}," + ",".join(quantities) + "\n")
+
+    return {"items": items, "days": len(days), "rows": items * 2, "cells": items * 2 * len(days)}
+
+##################################################################
+# timing
+##################################################################
+
+def peak_rss_mb():
+    # the whole process's high-water mark, so only meaningful for the run as a whole
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def process_status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"): return int(line.split()[1]) / 1024
+
+def reset_peak_rss():
+    # linux lets a process reset its own high-water mark (VmHWM), which is what makes a
+    # per-stage peak possible. returns the rss held now, or None where that isn't supported
+    try:
+        with open("/proc/self/clear_refs", "w") as f: f.write("5")
+        return process_status_mb("VmRSS")
+    except OSError:
+        return None
+
+def time_stage(name, func, repeats=1, units=None):
+    # runs func `repeats` times and records the best and mean wall time. units is how many
+    # rows/queries one call handles, used for the throughput figure. peak_rss_mb is the most
+    # the rss rose above what was held when a call started (None off linux), so it covers
+    # the csv parser's own buffers and doesn't carry over between stages
+    timings = []
+    peak = None
+    value = None
+    for _ in range(repeats):
+        held = reset_peak_rss()
+        started = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - started)
+        if held is not None: peak = max(peak or 0, process_status_mb("VmHWM") - held)
+
+    stage = {
+        "stage": name,
+        "repeats": repeats,
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "peak_rss_mb": None if peak is None else round(peak, 1),
+    }
+    if units is not None:
+        stage["throughput_per_s"] = units / stage["best_s"] if stage["best_s"] else None
+    peak_text = "-" if peak is None else f"{peak:.1f} MB"
+    print(f" • {name:<32} best {stage['best_s'] * 1000:>10.2f} ms | peak rss {peak_text:>11}")
+    return stage, value
+
+##################################################################
+# benchmark
+##################################################################
+
+def run_benchmark(items, years, repeats=5, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="sales_bench_")
+    filename = os.path.join(workdir, f"sales_{items}x{years}y.csv")
+
+    print(f"{main.Colours.GREEN}generating {items} items x {years} years{main.Colours.RESET}")
+    dataset = generate_sales_csv(filename, items, years)
+    dataset["bytes"] = os.path.getsize(filename)
+    melted_rows = dataset["cells"]
+
+    # pandas and numpy are imported lazily, make sure that cost doesn't land in the first stage
+    main.pd.DataFrame, main.np.ndarray
+
+    main.CACHE_DIR = os.path.join(workdir, ".sales_cache")
+    main.plot_cache.directory = os.path.join(workdir, "plots")
+    stages = []
+
+    stage, df = time_stage("load_data (parse, no cache)", lambda: main.load_data(filename, use_cache=False), units=melted_rows)
+    stages.append(stage)
+    stage, _ = time_stage("load_data (streamed, 64M)", lambda: main.load_data(filename, use_cache=False, memory_budget="64M"), units=melted_rows)
+    stages.append(stage)
+    stage, _ = time_stage("load_data (cold, writes cache)", lambda: main.load_data(filename), units=melted_rows)
+    stages.append(stage)
+    stage, df = time_stage("load_data (warm cache)", lambda: main.load_data(filename), repeats=repeats, units=melted_rows)
+    stages.append(stage)
+    stage, cube = time_stage("build_sales_cube", lambda: main.build_sales_cube(df), units=melted_rows)
+    stages.append(stage)
+
+    # the last four weeks is the typical interactive query, the full history is the worst case
+    last_day = cube.days[-1].astype(datetime)
+    ranges = {
+        "28d": ((last_day - timedelta(days=27)).strftime("%d/%m/%Y"), last_day.strftime("%d/%m/%Y")),
+        "all": (None, None),
+    }
+    menu_item = cube.items[0]
+
+    # call the undecorated analyses so the query cache doesn't hide the real cost
+    analyses = {
+        "analyze_item_sales": lambda start, end: main.analyze_item_sales.__wrapped__(df, menu_item, start, end, cube=cube),
+        "analyze_meal_trends": lambda start, end: main.analyze_meal_trends.__wrapped__(df, None, start, end, cube=cube),
+        "find_top_items": lambda start, end: main.find_top_items.__wrapped__(df, start, end, cube=cube),
+        "analyze_rolling_sales": lambda start, end: main.analyze_rolling_sales.__wrapped__(df, None, start, end, cube=cube),
+    }
+    plot_futures = []
+    for name, analysis in analyses.items():
+        for range_name, (start, end) in ranges.items():
+            def call(analysis=analysis, start=start, end=end):
+                result, plot_future = analysis(start, end)
+                plot_futures.append(plot_future)
+                return result
+            stage, _ = time_stage(f"{name} ({range_name})", call, repeats=repeats, units=1)
+            stages.append(stage)
+
+    for plot_future in plot_futures:
+        main.wait_for_plot(plot_future)
+
+    # plot saving on its own, in this process, for a daily line over the whole history
+    spec = {
+        'kind': 'line',
+        'figsize': (10, 5),
+        'x': cube.days,
+        'series': [{'y': cube.daily_sales(0, len(cube.days)).sum(axis=1), 'marker': 'o'}],
+        'title': 'benchmark',
+        'xlabel': 'date',
+        'ylabel': 'units sold',
+        'grid': True,
+    }
+    plot_filename = os.path.join(workdir, "benchmark_plot.png")
+    stage, _ = time_stage("render_plot (all days)", lambda: main.render_plot(spec, plot_filename), repeats=min(repeats, 3), units=1)
+    stages.append(stage)
+
+    return {"dataset": dataset, "stages": stages, "peak_rss_mb": round(peak_rss_mb(), 1)}, workdir
+
+def memory_change(before, after):
+    if before.get("peak_rss_mb") is None or after.get("peak_rss_mb") is None: return "-"
+    return f"{before['peak_rss_mb']:.1f} -> {after['peak_rss_mb']:.1f}"
+
+def compare_results(current, previous):
+    previous_stages = {stage["stage"]: stage for stage in previous["stages"]}
+    print(f"\n{'stage':<34} | {'before (ms)':>12} | {'after (ms)':>12} | {'change':>8} | {'peak (MB)':>17}")
+    print("-" * 96)
+    for stage in current["stages"]:
+        before = previous_stages.get(stage["stage"])
+        if before is None: continue
+        change = (stage["best_s"] - before["best_s"]) / before["best_s"] * 100 if before["best_s"] else 0
+        colour = main.Colours.RED if change > 10 else main.Colours.GREEN if change < -10 else ""
+        print(f"{stage['stage']:<34} | {before['best_s'] * 1000:>12.2f} | {stage['best_s'] * 1000:>12.2f} | {colour}{change:>+7.1f}%{main.Colours.RESET} | {memory_change(before, stage):>17}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark the sales analysis hot paths on synthetic data")
+    parser.add_argument("--preset", choices=PRESETS, default="small", help="dataset size (items x years)")
+    parser.add_argument("--items", type=int, help="override the number of menu items")
+    parser.add_argument("--years", type=float, help="override the number of years of history")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the json results")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the generated dataset and cache")
+    return parser.parse_args(argv)
+
+def main_benchmark(argv=None):
+    args = parse_args(argv)
+    items, years = PRESETS[args.preset]
+    items = args.items or items
+    years = args.years or years
+
+    results, workdir = run_benchmark(items, years, repeats=args.repeats)
+    results["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "preset": args.preset,
+        "python": platform.python_version(),
+        "numpy": main.np.__version__,
+        "pandas": main.pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{main.Colours.GREEN}results written to '{args.output}'{main.Colours.RESET}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(results, json.load(f))
+
+    if args.keep: print(f"dataset kept in '{workdir}'")
+    else: shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,10 +1,48 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import argparse
+import atexit
+import contextlib
+import copy
+import functools
+import glob
+import hashlib
+import importlib.util
+import inspect
+import json
 import random
+import re
+import shutil
+import sqlite3
 import string
+import subprocess
+import sys
+import threading
+import time
 import os
+import urllib.parse
+
+def lazy_import(name):
+    # the module is only actually imported the first time one of its attributes is used
+    if name in sys.modules: return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    # bind it on its package too, like a normal import, so `import concurrent.futures` elsewhere still works
+    parent, _, child = name.rpartition(".")
+    if parent: setattr(importlib.import_module(parent), child, module)
+    return module
+
+# numpy and pandas are deferred until an analysis needs them, and matplotlib is only
+# imported by the plot workers, always headless
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+futures = lazy_import("concurrent.futures")
+asyncio = lazy_import("asyncio")
+urllib_request = lazy_import("urllib.request")
+os.environ.setdefault("MPLBACKEND", "Agg")
 
 class Colours: 
     RED = "\033[91m"
@@ -12,11 +50,17 @@ class Colours:
     YELLOW = "\033[93m"
     BLUE = "\033[94m"
     RESET = "\033[0m"
+    
+    @classmethod
+    def disable(cls):
+        # plain output mode, every colour becomes an empty string
+        cls.RED = cls.GREEN = cls.YELLOW = cls.BLUE = cls.RESET = ""
 
 class MainMenuChoice:
     ITEM_SALES = "1"
     MEAL_TRENDS = "2"
     TOP_ITEMS = "3"
+    ROLLING = "4"
     EXIT = "0"
  
 class MealType:
@@ -78,6 +122,7 @@ def main_menu():
     print(" 1. sales data for specific menu item")
     print(" 2. lunch vs dinner trends")
     print(" 3. top selling menu items")
+    print(" 4. rolling sales and trends")
     print(" 0. exit program")
     print("")
     
@@ -85,10 +130,10 @@ def main_menu():
                                [MainMenuChoice.ITEM_SALES,
                                 MainMenuChoice.MEAL_TRENDS,
                                 MainMenuChoice.TOP_ITEMS,
+                                MainMenuChoice.ROLLING,
                                 MainMenuChoice.EXIT])
 
-def get_menu_items(df):
-    menu_items = df['Menu Item'].unique().tolist()
+def get_menu_items(menu_items):
     menu_item_map = {str(i+1): item for i, item in enumerate(menu_items)}
     
     display_header("select Menu Item")
@@ -111,42 +156,425 @@ def get_menu_items(df):
 ##################################################################
 
 def clear_screen():
-    # if the user is on a unix-like system, use `clear`. otherwise, use `cls`
-    os.system('cls' if os.name == 'nt' else 'clear')
+    # on unix-like systems write the ansi clear sequence directly instead of spawning `clear`,
+    # and don't clear at all when the output isn't a terminal. windows still uses `cls`
+    with tracer.span("clear_screen"):
+        if os.name == 'nt': os.system('cls')
+        elif sys.stdout.isatty(): print("\033[2J\033[H", end="", flush=True)
+
+def strip_colours(text):
+    return re.sub(r"\033\[[0-9;]*m", "", text)
     
 def generate_temp_filename():
     random_str = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
     if not os.path.exists("plots"): os.makedirs("plots")
     return f"plots/temp_plot_{random_str}.png"
 
-def save_plot(plt, filename = None):
-    if filename is None: filename = generate_temp_filename()
+##################################################################
+# instrumentation
+##################################################################
+
+class Tracer:
+    # per-query timing spans and counters. switched on with SALES_TRACE (or --trace):
+    # "1"/"stderr" prints a one-line summary per query, anything else is a file to append
+    # json lines to. when it's off every call is a single attribute check
+    NULL_SPAN = contextlib.nullcontext()
+    
+    def __init__(self):
+        self.enabled = False
+        self.target = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+    
+    def configure(self, target):
+        self.target = target or None
+        self.enabled = self.target is not None and self.target not in ("0", "")
+    
+    def current(self):
+        return getattr(self.local, "record", None)
+    
+    @contextlib.contextmanager
+    def query(self, name, **fields):
+        if not self.enabled or self.current() is not None:
+            # nested queries are folded into the outer one
+            yield
+            return
+        
+        record = {"query": name, "args": {key: str(value) for key, value in fields.items()},
+                  "spans": {}, "counters": {}, "started": time.perf_counter()}
+        record["last_lap"] = record["started"]
+        self.local.record = record
+        try:
+            yield
+        finally:
+            self.local.record = None
+            self.emit(record)
+    
+    def span(self, name):
+        if not self.enabled: return self.NULL_SPAN
+        return self.timed_span(name)
+    
+    @contextlib.contextmanager
+    def timed_span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+    
+    def lap(self, name):
+        # records the time since the query started or since the previous lap under `name`
+        if not self.enabled: return
+        record = self.current()
+        if record is None: return
+        now = time.perf_counter()
+        record["spans"][name] = record["spans"].get(name, 0) + (now - record["last_lap"]) * 1000
+        record["last_lap"] = now
+    
+    def add_time(self, name, seconds):
+        record = self.current()
+        if record is None:
+            self.emit({"query": name, "args": {}, "spans": {name: seconds * 1000}, "counters": {}, "started": time.perf_counter() - seconds})
+            return
+        record["spans"][name] = record["spans"].get(name, 0) + seconds * 1000
+        record["last_lap"] = time.perf_counter()
+    
+    def count(self, name, amount=1):
+        if not self.enabled: return
+        record = self.current()
+        if record is not None:
+            record["counters"][name] = record["counters"].get(name, 0) + int(amount)
+    
+    def emit(self, record):
+        total_ms = (time.perf_counter() - record.pop("started")) * 1000
+        record.pop("last_lap", None)
+        record["total_ms"] = round(total_ms, 3)
+        record["spans"] = {name: round(ms, 3) for name, ms in record["spans"].items()}
+        record["time"] = datetime.now().isoformat(timespec="milliseconds")
+        
+        with self.lock:
+            if self.target in ("1", "stderr"):
+                spans = " | ".join(f"{name} {ms:.2f}" for name, ms in record["spans"].items())
+                counters = ", ".join(f"{name}={value}" for name, value in record["counters"].items())
+                print(f"[trace] {record['query']} {total_ms:.2f} ms" + (f" | {spans}" if spans else "") + (f" | {counters}" if counters else ""), file=sys.stderr)
+            else:
+                with open(self.target, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+tracer = Tracer()
+tracer.configure(os.environ.get("SALES_TRACE"))
+
+##################################################################
+# plotting
+##################################################################
+
+PLOT_WORKERS = 2
+plot_pool = None
+
+def get_plot_pool():
+    global plot_pool
+    if plot_pool is None:
+        plot_pool = futures.ProcessPoolExecutor(max_workers=PLOT_WORKERS)
+        atexit.register(plot_pool.shutdown, wait=True, cancel_futures=True)
+    return plot_pool
+
+class PlotCache:
+    # content-addressed plot files, so repeating a query reuses the existing png.
+    # file modification times double as the lru clock, and eviction does the cleanup
+    def __init__(self, directory="plots", max_entries=64, max_age=24 * 60 * 60):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.pending = {}
+    
+    def path_for(self, key):
+        return os.path.join(self.directory, f"plot_{key}.png")
+    
+    def get(self, key):
+        path = self.path_for(key)
+        try: os.utime(path)
+        except OSError: return None
+        return path
+    
+    def evict(self):
+        try: names = [name for name in os.listdir(self.directory) if name.startswith("plot_") and name.endswith(".png")]
+        except OSError: return
+        
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try: entries.append((os.path.getmtime(path), path))
+            except OSError: pass
+        entries.sort(reverse=True)
+        
+        now = time.time()
+        for i, (mtime, path) in enumerate(entries):
+            if i >= self.max_entries or now - mtime > self.max_age:
+                try: os.remove(path)
+                except OSError: pass
+
+plot_cache = PlotCache()
+
+def plot_cache_key(kind, menu_item, start_date, end_date, fingerprint):
+    parts = [kind, menu_item or "", f"{start_date:%Y-%m-%d}" if start_date else "", f"{end_date:%Y-%m-%d}" if end_date else "", fingerprint]
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()[:20]
 
-    plt.savefig(filename)
+def render_plot(spec, filename):
+    # runs in a worker process, so it only uses its own figure object and never pyplot
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=spec['figsize'])
+    ax = fig.add_subplot()
+    
+    if spec['kind'] == 'bar':
+        ax.bar(spec['x'], spec['series'][0]['y'], color=spec['series'][0]['color'])
+    elif spec['kind'] == 'stacked_bar':
+        bottom = np.zeros(len(spec['x']))
+        for series in spec['series']:
+            ax.bar(spec['x'], series['y'], bottom=bottom, label=series['label'])
+            bottom = bottom + series['y']
+    else:
+        for series in spec['series']:
+            ax.plot(spec['x'], series['y'], marker=series['marker'], label=series.get('label'), color=series.get('color'))
+    
+    ax.set_title(spec['title'])
+    ax.set_xlabel(spec['xlabel'])
+    ax.set_ylabel(spec['ylabel'])
+    ax.tick_params(axis='x', rotation=45)
+    if spec.get('grid'): ax.grid(True)
+    if spec.get('legend'): ax.legend()
+    fig.tight_layout()
+    
+    # write to a temporary name first so a cached path never points at a half-written file
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    fig.savefig(tmp_filename, format='png')
+    os.replace(tmp_filename, filename)
     return filename
 
+def completed_plot(filename):
+    # a plot future that is already done, for graphs that don't need rendering
+    future = futures.Future()
+    future.set_result(filename)
+    future.filename = filename
+    return future
+
+def submit_plot(spec, filename=None, cache_key=None):
+    # returns a future for the saved filename, rendering in the background when possible
+    if cache_key is not None:
+        cached = plot_cache.get(cache_key)
+        tracer.count("plot_cache_hit" if cached is not None else "plot_cache_miss")
+        if cached is not None:
+            return completed_plot(cached)
+        if cache_key in plot_cache.pending:
+            return plot_cache.pending[cache_key]
+        filename = plot_cache.path_for(cache_key)
+        os.makedirs(plot_cache.directory, exist_ok=True)
+    elif filename is None:
+        filename = generate_temp_filename()
+    
+    try:
+        future = get_plot_pool().submit(render_plot, spec, filename)
+    except (OSError, RuntimeError):
+        future = futures.Future()
+        try: future.set_result(render_plot(spec, filename))
+        except Exception as e: future.set_exception(e)
+    # the server hands out the file name before the render has finished
+    future.filename = filename
+    
+    if cache_key is not None:
+        plot_cache.pending[cache_key] = future
+        future.add_done_callback(lambda _: plot_cache.pending.pop(cache_key, None))
+        plot_cache.evict()
+    return future
+
+def wait_for_plot(plot_future):
+    try:
+        with tracer.span("plot_wait"):
+            return plot_future.result()
+    except Exception as e:
+        print(f"{Colours.RED}error generating graph: {str(e)}{Colours.RESET}")
+        return None
+
+##################################################################
+# data caching
+##################################################################
+
+CACHE_DIR = ".sales_cache"
+CACHE_FORMAT_VERSION = 5
+
+def file_content_hash(filename, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_cache_path(filename):
+    # one cache directory per source file, named after its absolute path
+    path_key = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, path_key)
+
+def column_block_digests(filename, *column_counts):
+    # sha256 of the raw text of the first n columns on every line, one digest per n, so a csv
+    # that only gained columns can be told apart from one whose existing cells were edited
+    prefixes = [re.compile(f"(?:[^,\\n]*,){{0,{max(count - 1, 0)}}}[^,\\n]*") for count in column_counts]
+    digests = [hashlib.sha256() for _ in column_counts]
+    with open(filename, newline="") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            for prefix, digest in zip(prefixes, digests):
+                digest.update(prefix.match(line).group(0).encode() + b"\n")
+    return [digest.hexdigest() for digest in digests]
+
+def read_cache_meta(cache_path):
+    try:
+        with open(os.path.join(cache_path, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_cache_valid(meta, filename):
+    if meta is None or meta.get("version") != CACHE_FORMAT_VERSION:
+        return False
+
+    stat = os.stat(filename)
+    source = meta["source"]
+    if source["path"] != os.path.abspath(filename) or source["size"] != stat.st_size:
+        return False
+    if source["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    # the file was touched, only rebuild if the contents actually changed
+    if source["sha256"] != file_content_hash(filename):
+        return False
+    source["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+def update_cache_meta(cache_path, meta):
+    with open(os.path.join(cache_path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+def write_data_cache(df, filename, cache_path):
+    # columns are written as plain .npy files so they can be memory-mapped back in,
+    # text columns are stored as integer codes with their categories kept in meta.json
+    stat = os.stat(filename)
+    meta = {
+        "version": CACHE_FORMAT_VERSION,
+        "source": {
+            "path": os.path.abspath(filename),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_content_hash(filename),
+        },
+        "rows": len(df),
+        "header": df.attrs.get("source_columns", []),
+        "header_digest": df.attrs.get("source_digest"),
+        "columns": [],
+    }
+
+    tmp_path = f"{cache_path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        spec = {"name": column, "file": f"col{i}.npy"}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            spec["kind"] = "category"
+            spec["categories"] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(series.dtype):
+            # nullable integers are stored as plain values plus a separate missing mask
+            spec["kind"] = "masked"
+            spec["mask_file"] = f"col{i}_mask.npy"
+            values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+            np.save(os.path.join(tmp_path, spec["mask_file"]), series.isna().to_numpy(), allow_pickle=False)
+        elif pd.api.types.is_datetime64_any_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+            spec["kind"] = "array"
+            values = series.to_numpy()
+        else:
+            codes, categories = pd.factorize(series, use_na_sentinel=True)
+            spec["kind"] = "text"
+            spec["dtype"] = str(series.dtype)
+            spec["categories"] = categories.tolist()
+            values = codes
+        np.save(os.path.join(tmp_path, spec["file"]), values, allow_pickle=False)
+        meta["columns"].append(spec)
+
+    update_cache_meta(tmp_path, meta)
+
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
+
+def read_data_cache(cache_path, meta):
+    columns = {}
+    for spec in meta["columns"]:
+        # a plain ndarray view, still backed by the map, so the frame doesn't hand out np.memmap
+        values = np.load(os.path.join(cache_path, spec["file"]), mmap_mode="r", allow_pickle=False).view(np.ndarray)
+        if spec["kind"] == "category":
+            columns[spec["name"]] = pd.Categorical.from_codes(values, categories=spec["categories"])
+        elif spec["kind"] == "masked":
+            mask = np.load(os.path.join(cache_path, spec["mask_file"]), allow_pickle=False)
+            columns[spec["name"]] = pd.arrays.IntegerArray(values, mask)
+        elif spec["kind"] == "text":
+            categories = np.array(spec["categories"] + [None], dtype=object)
+            columns[spec["name"]] = pd.Series(categories[values]).astype(spec["dtype"])
+        else:
+            columns[spec["name"]] = values
+    # copy=False keeps the columns as views of the memory maps, so a warm load only maps
+    # the files and pages are read in as they're used
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs["source_columns"] = meta["header"]
+    df.attrs["source_digest"] = meta.get("header_digest")
+    return df
+
 ##################################################################
 # data loading and processing
 ##################################################################
 
-def load_data(filename="Task4a_data.csv"):
+def load_data(filename="Task4a_data.csv", use_cache=True, memory_budget=None):
+    with tracer.query("load_data", filename=filename, memory_budget=memory_budget):
+        return load_data_traced(filename, use_cache, memory_budget)
+
+def load_data_traced(filename, use_cache, memory_budget):
     try:
-        raw_df = pd.read_csv(filename, skiprows=0)
-        
-        meta_columns = ['Menu Item', 'Service']
-        date_columns = [col for col in raw_df.columns if col not in meta_columns]
-        
-        melted_df = pd.melt(
-            raw_df, 
-            id_vars=meta_columns,
-            value_vars=date_columns,
-            var_name='Date',
-            value_name='Quantity'
-        )
+        if use_cache:
+            cache_path = get_cache_path(filename)
+            meta = read_cache_meta(cache_path)
+            if is_cache_valid(meta, filename):
+                tracer.count("data_cache_hit")
+                try: update_cache_meta(cache_path, meta)
+                except OSError: pass
+                with tracer.span("read_cache"):
+                    return read_data_cache(cache_path, meta)
+            tracer.count("data_cache_miss")
+
+        melted_df = None
+        if use_cache and meta is not None and meta.get("version") == CACHE_FORMAT_VERSION:
+            # if the export only gained new date columns, extend the cached frame with just those
+            with tracer.span("ingest_new_days"):
+                melted_df = ingest_new_days(read_data_cache(cache_path, meta), filename)
         
-        melted_df['Date'] = pd.to_datetime(melted_df['Date'], format='%d/%m/%Y', errors='coerce')
-        melted_df.rename(columns={'Service': 'MealType'}, inplace=True)
+        if melted_df is None:
+            with tracer.span("parse_csv"):
+                # digest first, so an edit made while parsing can only make the digest stale (and
+                # force a later full reload), never vouch for cells that weren't parsed
+                header = pd.read_csv(filename, nrows=0).columns
+                digest, = column_block_digests(filename, len(header))
+                if memory_budget is None: melted_df = parse_sales_csv(filename)
+                else: melted_df = parse_sales_csv_streamed(filename, memory_budget)
+                if melted_df.attrs["source_columns"] == header.tolist(): melted_df.attrs["source_digest"] = digest
+        tracer.count("rows_loaded", len(melted_df))
         
+        # the csv is new or has changed, so nothing answered from the old data is valid
+        query_cache.clear()
+
+        if use_cache:
+            try:
+                with tracer.span("write_cache"):
+                    write_data_cache(melted_df, filename, cache_path)
+            except OSError as e: print(f"{Colours.YELLOW}warning: couldn't write data cache: {str(e)}{Colours.RESET}")
+
         return melted_df
         
     except FileNotFoundError:
@@ -162,108 +590,1026 @@ def load_data(filename="Task4a_data.csv"):
         print(f"{Colours.RED}error: {str(e)}{Colours.RESET}")
         return None
 
+def parse_date_headers(headers):
+    # parses each distinct DD/MM/YYYY header once (the export mixes "3/3/2023" and "13/03/2023").
+    # returns the parsed dates and the list of headers that aren't valid dates
+    unique_headers, inverse = np.unique(np.asarray(headers, dtype=str), return_inverse=True)
+    parsed = pd.to_datetime(pd.Series(unique_headers), format='%d/%m/%Y', errors='coerce').to_numpy()
+    dates = parsed[inverse]
+    malformed = [header for header, date in zip(headers, dates) if np.isnat(date)]
+    return dates, malformed
+
+def order_date_columns(date_columns, filename):
+    # returns the valid date columns in chronological order along with their dates,
+    # warning about (and skipping) any header that isn't a date
+    dates, malformed = parse_date_headers(date_columns)
+    if malformed:
+        shown = ", ".join(f"'{header}'" for header in malformed[:5]) + (", ..." if len(malformed) > 5 else "")
+        print(f"{Colours.YELLOW}warning: skipped {len(malformed)} column(s) in '{filename}' that aren't DD/MM/YYYY dates: {shown}{Colours.RESET}")
+    
+    valid = ~np.isnat(dates)
+    order = np.flatnonzero(valid)[np.argsort(dates[valid], kind='stable')]
+    return [date_columns[i] for i in order], dates[order]
+
+def parse_sales_csv(filename, compact=True, date_columns=None):
+    meta_columns = ['Menu Item', 'Service']
+    if date_columns is None:
+        raw_df = pd.read_csv(filename, skiprows=0)
+        source_columns = raw_df.columns.tolist()
+        date_columns = [col for col in raw_df.columns if col not in meta_columns]
+    else:
+        raw_df = pd.read_csv(filename, skiprows=0, usecols=meta_columns + date_columns)
+        source_columns = meta_columns + date_columns
+    
+    # the headers are parsed once per day rather than once per melted row, and taking the
+    # columns in date order means the melted rows come out already sorted by date
+    date_columns, dates = order_date_columns(date_columns, filename)
+    row_count = len(raw_df)
+    
+    melted_df = pd.DataFrame({
+        'Menu Item': np.tile(raw_df['Menu Item'].to_numpy(), len(date_columns)),
+        'MealType': np.tile(raw_df['Service'].to_numpy(), len(date_columns)),
+        'Date': np.repeat(dates, row_count),
+        'Quantity': raw_df[date_columns].to_numpy().T.reshape(-1),
+    })
+    melted_df.attrs["source_columns"] = source_columns
+    
+    return compact_sales_frame(melted_df) if compact else melted_df
+
+def ingest_new_days(df, filename, cube=None):
+    # melts only the date columns added to the csv since df was loaded and appends them,
+    # updating the cube in place if one is given. returns the extended frame, or None when
+    # the csv changed in some other way and needs a full reload
+    known_columns = df.attrs.get("source_columns")
+    columns = pd.read_csv(filename, nrows=0).columns.tolist()
+    if not known_columns or columns[:len(known_columns)] != known_columns or len(columns) == len(known_columns):
+        return None
+    if len(df) and pd.isna(df['Date'].iloc[-1]):
+        return None
+    
+    # the known columns must be byte for byte what was loaded, an export that corrects an old
+    # cell and appends a day in one go has to be reparsed in full
+    known_digest, digest = column_block_digests(filename, len(known_columns), len(columns))
+    if df.attrs.get("source_digest") != known_digest:
+        return None
+    
+    new_df = parse_sales_csv(filename, date_columns=columns[len(known_columns):])
+    if len(new_df) and len(df) and new_df['Date'].iloc[0] <= df['Date'].iloc[-1]:
+        return None
+    
+    for column in ['Menu Item', 'MealType']:
+        categories = df[column].cat.categories
+        if not new_df[column].cat.categories.isin(categories).all():
+            return None
+        new_df[column] = new_df[column].cat.set_categories(categories)
+    
+    if cube is not None and not cube.append_cube(build_sales_cube(new_df)):
+        return None
+    
+    combined = pd.concat([df, new_df], ignore_index=True)
+    combined.attrs["source_columns"] = columns
+    combined.attrs["source_digest"] = digest
+    query_cache.clear()
+    return combined
+
+def smallest_int_dtype(values):
+    # values must be whole numbers without gaps
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def compact_sales_frame(df):
+    # menu items and meal types become categoricals (integer codes plus a lookup table)
+    # and quantities use the smallest integer dtype that holds them
+    for column in ['Menu Item', 'MealType']:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    
+    quantity = df['Quantity']
+    values = quantity.dropna().to_numpy()
+    if len(values) and not np.all(np.mod(values, 1) == 0):
+        return df
+    
+    dtype = smallest_int_dtype(values)
+    if quantity.isna().any():
+        df['Quantity'] = quantity.astype(dtype.name.capitalize())
+    else:
+        df['Quantity'] = quantity.to_numpy().astype(dtype)
+    return df
+
+def memory_report(filename="Task4a_data.csv"):
+    before = parse_sales_csv(filename, compact=False)
+    after = compact_sales_frame(before.copy())
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+    
+    result = f"{Colours.GREEN}memory usage for {filename} ({len(before)} rows){Colours.RESET}\n"
+    result += "-" * 50 + "\n"
+    result += f"{'column':<12} | {'before':>14} | {'after':>14}\n"
+    result += "-" * 50 + "\n"
+    for column in before.columns:
+        result += f"{column:<12} | {before_usage[column]:>8,} bytes | {after_usage[column]:>8,} bytes\n"
+    result += "-" * 50 + "\n"
+    result += f"{'total':<12} | {before_usage.sum():>8,} bytes | {after_usage.sum():>8,} bytes\n"
+    result += f"{Colours.YELLOW}compact frame uses {after_usage.sum() / before_usage.sum() * 100:.1f}% of the original memory{Colours.RESET}\n"
+    return result
+
+def parse_memory_size(size):
+    # accepts a number of bytes or a string like "512M" / "2GB"
+    if isinstance(size, (int, float)): return int(size)
+    units = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    number = size.strip().upper().removesuffix("B")
+    unit = number[-1] if number and number[-1] in units else ""
+    return int(float(number.removesuffix(unit)) * units[unit])
+
+def parse_sales_csv_streamed(filename, memory_budget):
+    # reads the wide csv in row chunks sized to fit the memory budget, keeping each chunk
+    # as a compact int32 block (float64 once a value isn't a whole int32), then melts the blocks straight into preallocated typed arrays
+    meta_columns = ['Menu Item', 'Service']
+    header = pd.read_csv(filename, nrows=0).columns
+    
+    # order the date columns chronologically so the output comes out date sorted
+    date_columns, dates = order_date_columns([col for col in header if col not in meta_columns], filename)
+    
+    # parsing a chunk costs roughly a float64 frame plus the int32 block we keep
+    bytes_per_row = max(1, len(date_columns)) * (8 + 4) * 2
+    chunk_rows = max(1, parse_memory_size(memory_budget) // bytes_per_row)
+    
+    items, services = {}, {}
+    item_blocks, service_blocks, quantity_blocks, missing_blocks = [], [], [], []
+    int32 = np.iinfo(np.int32)
+    whole_numbers = True
+    
+    reader = pd.read_csv(filename, chunksize=chunk_rows, dtype={'Menu Item': str, 'Service': str})
+    for chunk in reader:
+        item_blocks.append(np.array([-1 if pd.isna(v) else items.setdefault(v, len(items)) for v in chunk['Menu Item']], dtype=np.int32))
+        service_blocks.append(np.array([-1 if pd.isna(v) else services.setdefault(v, len(services)) for v in chunk['Service']], dtype=np.int32))
+        
+        values = chunk[date_columns].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        present = values[~missing]
+        if whole_numbers and len(present) and (np.any(np.mod(present, 1) != 0) or present.min() < int32.min or present.max() > int32.max):
+            # int32 blocks would truncate fractions or wrap large values, so from here on every
+            # block stays float64 (gaps as nan), the same data parse_sales_csv() would return
+            whole_numbers = False
+            quantity_blocks = [np.where(block_missing, np.nan, block) if block_missing is not None else block.astype(np.float64)
+                               for block, block_missing in zip(quantity_blocks, missing_blocks)]
+        if whole_numbers:
+            quantity_blocks.append(np.where(missing, 0, values).astype(np.int32))
+        else:
+            quantity_blocks.append(values)
+        missing_blocks.append(missing if missing.any() else None)
+        del chunk, values, missing, present
+    
+    row_count = sum(len(block) for block in item_blocks)
+    cell_count = row_count * len(date_columns)
+    
+    item_codes = np.empty(cell_count, dtype=np.int32)
+    service_codes = np.empty(cell_count, dtype=np.int32)
+    quantities = np.empty(cell_count, dtype=np.int32 if whole_numbers else np.float64)
+    has_missing = whole_numbers and any(block is not None for block in missing_blocks)
+    missing = np.zeros(cell_count, dtype=bool) if has_missing else None
+    
+    # the output is date-major, so each block fills a column slice of a (dates x rows) view
+    start = 0
+    for i in range(len(item_blocks)):
+        end = start + len(item_blocks[i])
+        item_codes.reshape(len(date_columns), row_count)[:, start:end] = item_blocks[i]
+        service_codes.reshape(len(date_columns), row_count)[:, start:end] = service_blocks[i]
+        quantities.reshape(len(date_columns), row_count)[:, start:end] = quantity_blocks[i].T
+        if has_missing and missing_blocks[i] is not None:
+            missing.reshape(len(date_columns), row_count)[:, start:end] = missing_blocks[i].T
+        item_blocks[i] = service_blocks[i] = quantity_blocks[i] = missing_blocks[i] = None
+        start = end
+    
+    melted_df = compact_sales_frame(pd.DataFrame({
+        'Menu Item': pd.Categorical.from_codes(item_codes, categories=list(items)),
+        'MealType': pd.Categorical.from_codes(service_codes, categories=list(services)),
+        'Date': np.repeat(dates, row_count),
+        'Quantity': pd.arrays.IntegerArray(quantities, missing) if has_missing else quantities,
+    }))
+    melted_df.attrs["source_columns"] = header.tolist()
+    return melted_df
+
+def select_date_range(df, start_date=None, end_date=None):
+    # df must be sorted by date, as returned by load_data(). returns a slice of the
+    # rows in the range, so the cost depends on the window and not the full history
+    dates = df['Date'].to_numpy()
+    lo, hi = 0, np.searchsorted(dates, np.datetime64('NaT'), side='left')
+    if start_date is not None: lo = np.searchsorted(dates, np.datetime64(start_date, 'ns'), side='left')
+    if end_date is not None: hi = np.searchsorted(dates, np.datetime64(end_date, 'ns'), side='right')
+    return df.iloc[lo:max(lo, hi)]
+
+def find_site_files(pattern):
+    # a directory means every csv in it, anything else is treated as a glob
+    if os.path.isdir(pattern): pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+def site_labels(filenames):
+    # sites are named after their files, or after their path below the shared directory when
+    # several files have the same name (e.g. multi/*/export.csv)
+    names = [os.path.splitext(os.path.basename(filename))[0] for filename in filenames]
+    if len(set(names)) == len(names): return names
+    root = os.path.commonpath([os.path.abspath(os.path.dirname(filename)) for filename in filenames])
+    return [os.path.splitext(os.path.relpath(os.path.abspath(filename), root))[0].replace(os.sep, "/") for filename in filenames]
+
+def load_site_file(filename, use_cache=True, memory_budget=None):
+    # runs in a worker process, each site keeps its own on-disk cache
+    return load_data(filename, use_cache=use_cache, memory_budget=memory_budget)
+
+def load_sites(pattern, workers=None, use_cache=True, memory_budget=None):
+    # loads one wide csv per restaurant in parallel and combines them into a single compact
+    # frame with a categorical Site column, named by site_labels()
+    filenames = find_site_files(pattern)
+    if not filenames:
+        print(f"{Colours.RED}error: no site files match '{pattern}'.{Colours.RESET}")
+        return None
+    
+    with tracer.query("load_sites", pattern=pattern, files=len(filenames)):
+        with futures.ProcessPoolExecutor(max_workers=workers or min(len(filenames), os.cpu_count() or 1)) as pool:
+            frames = list(pool.map(functools.partial(load_site_file, use_cache=use_cache, memory_budget=memory_budget), filenames))
+        
+        sites = site_labels(filenames)
+        if any(frame is None for frame in frames):
+            return None
+        
+        # align the categories across sites so the combined columns stay categorical
+        for column in ['Menu Item', 'MealType']:
+            categories = pd.api.types.union_categoricals([frame[column] for frame in frames]).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+        
+        for code, frame in enumerate(frames):
+            frame['Site'] = pd.Categorical.from_codes(np.full(len(frame), code, dtype=np.int16), categories=sites)
+        
+        combined = pd.concat(frames, ignore_index=True)
+        combined.sort_values('Date', kind='stable', na_position='last', inplace=True, ignore_index=True)
+        tracer.count("rows_loaded", len(combined))
+        return compact_sales_frame(combined)
+
+class SalesSession:
+    # loads the data on first use, then keeps the frame and its cube in step with the csv,
+    # appending new days in place where possible
+    def __init__(self, filename="Task4a_data.csv", use_cache=True, memory_budget=None, sites=None, backend="memory"):
+        self.filename = filename
+        self.use_cache = use_cache
+        self.memory_budget = memory_budget
+        self.sites = sites
+        self.backend = backend
+        self.df = None
+        self.cube = None
+        self.loaded = False
+        self.last_modified = None
+    
+    def get(self):
+        if not self.loaded:
+            self.reload()
+        elif self.backend == "sqlite":
+            # the store re-imports itself when the csv has changed
+            try: modified = os.stat(self.filename).st_mtime_ns
+            except OSError: modified = self.last_modified
+            if modified != self.last_modified: self.reload()
+        elif self.sites is None:
+            try: modified = os.stat(self.filename).st_mtime_ns
+            except OSError: modified = self.last_modified
+            if modified != self.last_modified:
+                # the new days go into a copy that shares the buffers (appends only write past the
+                # days the current cube can see), so callers still holding the old frame and cube
+                # keep a consistent pair and the new pair replaces them in one assignment
+                cube = copy.copy(self.cube)
+                extended_df = ingest_new_days(self.df, self.filename, cube)
+                if extended_df is not None:
+                    self.df, self.cube = extended_df, cube
+                    self.last_modified = modified
+                else:
+                    self.reload()
+        return self.df, self.cube
+    
+    def reload(self):
+        try: modified = os.stat(self.filename).st_mtime_ns
+        except OSError: modified = None
+        if self.backend == "sqlite":
+            store = open_sqlite_store(self.filename, use_cache=self.use_cache, memory_budget=self.memory_budget)
+            if store is not None:
+                self.df, self.cube = None, store
+                self.loaded = True
+                self.last_modified = modified
+            return
+        if self.sites is not None: df = load_sites(self.sites, use_cache=self.use_cache, memory_budget=self.memory_budget)
+        else: df = load_data(self.filename, use_cache=self.use_cache, memory_budget=self.memory_budget)
+        if df is not None:
+            # a cube that wouldn't fit the memory budget isn't kept, each analysis then builds
+            # a cube over just the days it reads
+            self.df, self.cube = df, None
+            if self.memory_budget is None or estimate_cube_bytes(df) <= parse_memory_size(self.memory_budget):
+                with tracer.span("build_sales_cube"):
+                    self.cube = build_sales_cube(df)
+            self.loaded = True
+            self.last_modified = modified
+    
+    def labels(self):
+        # the menu items, meal types and sites, read from the frame when no cube is kept
+        df, cube = self.get()
+        if cube is not None:
+            return {"items": list(cube.items), "services": list(cube.services), "sites": list(cube.sites)}
+        if df is None: return None
+        return {"items": factorize_labels(df['Menu Item'].dropna())[1],
+                "services": factorize_labels(df['MealType'].dropna())[1],
+                "sites": factorize_labels(df['Site'])[1] if 'Site' in df.columns else []}
+    
+    def items(self):
+        labels = self.labels()
+        return None if labels is None else labels["items"]
+    
+    def run(self, job):
+        # runs one analysis job, returning (report, plot future) so the report can be shown
+        # while the graph is still rendering
+        df, cube = self.get()
+        return ANALYSES[job["analysis"]](df, cube, job)
+
 ##################################################################
-# analysis
+# sqlite storage
 ##################################################################
 
-def analyze_item_sales(df, menu_item, start_date=None, end_date=None):
+SQLITE_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE services (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE sales (item_id INTEGER NOT NULL, service_id INTEGER NOT NULL, day INTEGER NOT NULL, quantity);
+"""
+
+SQLITE_INDEXES = """
+CREATE INDEX sales_item_day ON sales (item_id, day);
+CREATE INDEX sales_service_day ON sales (service_id, day);
+"""
+
+class SqliteSalesStore:
+    # keeps the sales in an indexed sqlite file and answers the same questions as SalesCube
+    # (day_bounds, daily_sales, item_totals) with queries, so only the answers are held in memory.
+    # days are stored as integer days since 1970-01-01
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.sites = {}
+        
+        connection = self.connection()
+        self.items = [name for (name,) in connection.execute("SELECT name FROM items ORDER BY id")]
+        self.item_index = {item: i for i, item in enumerate(self.items)}
+        self.services = [name for (name,) in connection.execute("SELECT name FROM services ORDER BY id")]
+        self.service_index = {service: i for i, service in enumerate(self.services)}
+        self.days = np.array([day for (day,) in connection.execute("SELECT DISTINCT day FROM sales ORDER BY day")], dtype=np.int64).astype('datetime64[D]')
+        
+        meta = dict(connection.execute("SELECT key, value FROM meta"))
+        self.fingerprint = meta["fingerprint"]
+        self.dtype = np.int64 if meta["integer"] == "1" else np.float64
+    
+    def connection(self):
+        # sqlite connections can't be shared between threads, so each thread opens its own
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = connect_read_only(self.db_path)
+            self.local.connection = connection
+        return connection
+    
+    def day_bounds(self, start_date=None, end_date=None):
+        lo, hi = 0, len(self.days)
+        if start_date is not None: lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+        if end_date is not None: hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        return lo, max(lo, hi)
+    
+    def day_range(self, lo, hi):
+        return int(self.days[lo].astype(np.int64)), int(self.days[hi - 1].astype(np.int64))
+    
+    def daily_sales(self, lo, hi, menu_item=None):
+        sales = np.zeros((hi - lo, len(self.services)), dtype=self.dtype)
+        if hi <= lo: return sales
+        first_day, last_day = self.day_range(lo, hi)
+        
+        if menu_item is not None:
+            rows = self.connection().execute(
+                "SELECT day, service_id, SUM(quantity) FROM sales WHERE item_id = ? AND day BETWEEN ? AND ? GROUP BY day, service_id",
+                (self.item_index[menu_item], first_day, last_day))
+        else:
+            rows = (row for service_id in range(len(self.services)) for row in self.connection().execute(
+                "SELECT day, service_id, SUM(quantity) FROM sales WHERE service_id = ? AND day BETWEEN ? AND ? GROUP BY day",
+                (service_id, first_day, last_day)))
+        
+        for day, service_id, total in rows:
+            if total is None: continue
+            position = np.searchsorted(self.days, np.datetime64(day, 'D')) - lo
+            sales[position, service_id] = total
+        return sales
+    
+    def item_totals(self, lo, hi):
+        totals = np.zeros((len(self.items), len(self.services)), dtype=self.dtype)
+        counts = np.zeros((len(self.items), len(self.services)), dtype=np.int64)
+        if hi <= lo: return totals, counts
+        
+        rows = self.connection().execute(
+            "SELECT item_id, service_id, SUM(quantity), COUNT(quantity) FROM sales WHERE day BETWEEN ? AND ? GROUP BY item_id, service_id",
+            self.day_range(lo, hi))
+        for item_id, service_id, total, count in rows:
+            totals[item_id, service_id] = total or 0
+            counts[item_id, service_id] = count
+        return totals, counts
+    
+    def window_totals(self, starts, ends):
+        # fetches the daily totals the windows span once, then differences local prefix sums
+        first, last = int(np.min(starts)), int(np.max(ends))
+        sales = np.zeros((len(self.items), last - first + 1, len(self.services)), dtype=self.dtype)
+        if last > first:
+            rows = self.connection().execute(
+                "SELECT item_id, day, service_id, SUM(quantity) FROM sales WHERE day BETWEEN ? AND ? GROUP BY item_id, day, service_id",
+                self.day_range(first, last))
+            for item_id, day, service_id, total in rows:
+                if total is None: continue
+                sales[item_id, np.searchsorted(self.days, np.datetime64(day, 'D')) - first + 1, service_id] = total
+        cumsum = sales.cumsum(axis=1)
+        return cumsum[:, np.asarray(ends) - first, :] - cumsum[:, np.asarray(starts) - first, :]
+
+def connect_read_only(db_path):
+    # the path is quoted so ?, # and % in it aren't read as part of the uri
+    return sqlite3.connect(f"file:{urllib.parse.quote(db_path)}?mode=ro", uri=True)
+
+def get_sqlite_path(filename):
+    return os.path.splitext(filename)[0] + ".sqlite"
+
+def import_to_sqlite(df, db_path, source_hash, batch_size=100_000):
+    # one-time import of a loaded frame, written in batches so the inserts never hold a
+    # second copy of the whole history
+    tmp_path = f"{db_path}.tmp{os.getpid()}"
+    if os.path.exists(tmp_path): os.remove(tmp_path)
+    
+    connection = sqlite3.connect(tmp_path)
     try:
-        if start_date and end_date:
-            start_date = datetime.strptime(start_date, '%d/%m/%Y')
-            end_date = datetime.strptime(end_date, '%d/%m/%Y')
-            mask = (df['Date'] >= start_date) & (df['Date'] <= end_date)
-            filtered_df = df[mask]
+        connection.executescript(SQLITE_SCHEMA)
+        data = df[df['Date'].notna() & df['Menu Item'].notna() & df['MealType'].notna()]
+        item_codes, items = pd.factorize(data['Menu Item'])
+        service_codes, services = pd.factorize(data['MealType'])
+        connection.executemany("INSERT INTO items VALUES (?, ?)", enumerate(items.tolist()))
+        connection.executemany("INSERT INTO services VALUES (?, ?)", enumerate(services.tolist()))
+        
+        days = data['Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        quantity = data['Quantity'].astype(object).where(data['Quantity'].notna(), None).to_numpy()
+        for start in range(0, len(data), batch_size):
+            end = start + batch_size
+            connection.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)", zip(
+                item_codes[start:end].tolist(), service_codes[start:end].tolist(), days[start:end].tolist(),
+                [None if value is None else value.item() if hasattr(value, "item") else value for value in quantity[start:end]]))
+        
+        connection.executescript(SQLITE_INDEXES)
+        integer = pd.api.types.is_integer_dtype(data['Quantity'].dtype)
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("source_sha256", source_hash),
+            ("fingerprint", f"sqlite-{source_hash[:32]}"),
+            ("integer", "1" if integer else "0"),
+        ])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+
+def open_sqlite_store(filename, db_path=None, use_cache=True, memory_budget=None):
+    # opens the store next to the csv, (re)importing through load_data() only when the csv changed
+    db_path = db_path or get_sqlite_path(filename)
+    try:
+        source_hash = file_content_hash(filename)
+    except FileNotFoundError:
+        print(f"{Colours.RED}error: file '{filename}' not found.{Colours.RESET}")
+        return None
+    
+    try:
+        with connect_read_only(db_path) as connection:
+            stored_hash = connection.execute("SELECT value FROM meta WHERE key = 'source_sha256'").fetchone()[0]
+        if stored_hash == source_hash:
+            tracer.count("sqlite_store_hit")
+            return SqliteSalesStore(db_path)
+    except (sqlite3.Error, TypeError):
+        pass
+    
+    tracer.count("sqlite_store_import")
+    df = load_data(filename, use_cache=use_cache, memory_budget=memory_budget)
+    if df is None:
+        return None
+    with tracer.span("import_to_sqlite"):
+        import_to_sqlite(df, db_path, source_hash)
+    return SqliteSalesStore(db_path)
+
+##################################################################
+# aggregation
+##################################################################
+
+class SalesCube:
+    # dense menu item x day x meal type totals, with prefix sums along the day axis
+    # so any date range total is a subtraction instead of a groupby over every row.
+    # the day axis is over-allocated so new days can be appended in place. cells use the
+    # smallest dtype that holds them and prefix sums start at int32, both widened as needed
+    def __init__(self, items, days, services, sales, counts):
+        self.items = items
+        self.item_index = {item: i for i, item in enumerate(items)}
+        self.services = services
+        self.service_index = {service: i for i, service in enumerate(services)}
+        self.sites = {}
+        
+        self.day_count = 0
+        self.day_buffer = np.empty(0, dtype='datetime64[D]')
+        self.sales_buffer = np.zeros((len(items), 0, len(services)), dtype=sales.dtype)
+        self.counts_buffer = np.zeros((len(items), 0, len(services)), dtype=counts.dtype)
+        self.sales_cumsum_buffer = np.zeros((len(items), 1, len(services)), dtype=np.int32 if sales.dtype.kind in "iu" else np.float64)
+        self.counts_cumsum_buffer = np.zeros((len(items), 1, len(services)), dtype=np.int32)
+        self.fingerprint = self.compute_fingerprint(hashlib.blake2b(digest_size=16).hexdigest(), items + ["|"] + services)
+        
+        self.append_days(days, sales, counts)
+    
+    @staticmethod
+    def compute_fingerprint(previous, labels, days=(), sales=()):
+        # chained, so appending days only hashes the new slice
+        digest = hashlib.blake2b(previous.encode(), digest_size=16)
+        digest.update("\0".join(map(str, labels)).encode())
+        digest.update(np.ascontiguousarray(days).tobytes())
+        digest.update(np.ascontiguousarray(sales).tobytes())
+        return digest.hexdigest()
+    
+    def reserve(self, day_count):
+        # the first call sizes the buffers exactly, later ones (new days being appended) double
+        if day_count <= len(self.day_buffer): return
+        capacity = max(day_count, 2 * len(self.day_buffer), 16) if self.day_count else day_count
+        
+        def grow(buffer, length):
+            grown = np.zeros((buffer.shape[0], capacity + length, buffer.shape[2]), dtype=buffer.dtype)
+            grown[:, :buffer.shape[1], :] = buffer
+            return grown
+        
+        self.sales_buffer = grow(self.sales_buffer, 0)
+        self.counts_buffer = grow(self.counts_buffer, 0)
+        self.sales_cumsum_buffer = grow(self.sales_cumsum_buffer, 1)
+        self.counts_cumsum_buffer = grow(self.counts_cumsum_buffer, 1)
+        
+        day_buffer = np.empty(capacity, dtype='datetime64[D]')
+        day_buffer[:self.day_count] = self.day_buffer[:self.day_count]
+        self.day_buffer = day_buffer
+    
+    @staticmethod
+    def widen(buffer, cumsum_buffer, values, lo):
+        # returns the buffers in dtypes that hold `values` appended after day `lo`. integer prefix
+        # sums stay int32 while every prefix, and so every difference of two, fits in it
+        dtype = np.result_type(buffer.dtype, values.dtype)
+        if dtype.kind == "f":
+            cumsum_dtype = np.dtype(np.float64)
         else:
-            filtered_df = df
+            base = cumsum_buffer[:, lo, :].astype(np.int64)
+            high = (base + np.maximum(values, 0).sum(axis=1, dtype=np.int64)).max(initial=0)
+            low = (base + np.minimum(values, 0).sum(axis=1, dtype=np.int64)).min(initial=0)
+            cumsum_dtype = np.dtype(np.int32) if high - low <= np.iinfo(np.int32).max else np.dtype(np.int64)
+            cumsum_dtype = np.result_type(cumsum_buffer.dtype, cumsum_dtype)
+        return buffer.astype(dtype, copy=False), cumsum_buffer.astype(cumsum_dtype, copy=False)
+    
+    def append_days(self, days, sales, counts):
+        # days must all be after the current last day, sales/counts are (items x days x meal types)
+        # in this cube's item and meal type order
+        lo, hi = self.day_count, self.day_count + len(days)
+        self.reserve(hi)
         
-        item_data = filtered_df[filtered_df['Menu Item'] == menu_item]
-        if item_data.empty:
-            return f"{Colours.RED}no sales data found for {menu_item} in the selected period.{Colours.RESET}", None
+        self.sales_buffer, self.sales_cumsum_buffer = self.widen(self.sales_buffer, self.sales_cumsum_buffer, sales, lo)
+        self.counts_buffer, self.counts_cumsum_buffer = self.widen(self.counts_buffer, self.counts_cumsum_buffer, counts, lo)
+        
+        self.day_buffer[lo:hi] = days
+        self.sales_buffer[:, lo:hi, :] = sales
+        self.counts_buffer[:, lo:hi, :] = counts
+        np.cumsum(sales, axis=1, out=self.sales_cumsum_buffer[:, lo + 1:hi + 1, :])
+        np.cumsum(counts, axis=1, out=self.counts_cumsum_buffer[:, lo + 1:hi + 1, :])
+        self.sales_cumsum_buffer[:, lo + 1:hi + 1, :] += self.sales_cumsum_buffer[:, lo:lo + 1, :]
+        self.counts_cumsum_buffer[:, lo + 1:hi + 1, :] += self.counts_cumsum_buffer[:, lo:lo + 1, :]
+        
+        self.day_count = hi
+        self.days = self.day_buffer[:hi]
+        self.sales = self.sales_buffer[:, :hi, :]
+        self.counts = self.counts_buffer[:, :hi, :]
+        self.sales_cumsum = self.sales_cumsum_buffer[:, :hi + 1, :]
+        self.counts_cumsum = self.counts_cumsum_buffer[:, :hi + 1, :]
+        self.fingerprint = self.compute_fingerprint(self.fingerprint, [], days, sales)
+    
+    def append_cube(self, other):
+        # appends another cube's days, returning False if its items or meal types don't line up
+        if not set(other.items) <= set(self.items) or not set(other.services) <= set(self.services): return False
+        if len(other.days) and self.day_count and other.days[0] <= self.days[-1]: return False
+        
+        shape = (len(self.items), len(other.days), len(self.services))
+        item_order = [self.item_index[item] for item in other.items]
+        service_order = [self.service_index[service] for service in other.services]
+        sales = np.zeros(shape, dtype=other.sales.dtype)
+        counts = np.zeros(shape, dtype=other.counts.dtype)
+        sales[np.ix_(item_order, range(len(other.days)), service_order)] = other.sales
+        counts[np.ix_(item_order, range(len(other.days)), service_order)] = other.counts
+        
+        self.append_days(other.days, sales, counts)
+        return True
+
+    def day_bounds(self, start_date=None, end_date=None):
+        lo, hi = 0, len(self.days)
+        if start_date is not None: lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+        if end_date is not None: hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        return lo, max(lo, hi)
+
+    def daily_sales(self, lo, hi, menu_item=None):
+        # returns a (days x meal types) slice, summed over every item unless one is given
+        if menu_item is not None:
+            return self.sales[self.item_index[menu_item], lo:hi, :]
+        return self.sales[:, lo:hi, :].sum(axis=0)
+
+    def item_totals(self, lo, hi):
+        # returns (items x meal types) totals and non-empty row counts for the range
+        totals = self.sales_cumsum[:, hi, :] - self.sales_cumsum[:, lo, :]
+        counts = self.counts_cumsum[:, hi, :] - self.counts_cumsum[:, lo, :]
+        return totals, counts
+    
+    def window_totals(self, starts, ends):
+        # returns (items x windows x meal types) totals for many [start, end) day ranges at once
+        return self.sales_cumsum[:, ends, :] - self.sales_cumsum[:, starts, :]
+
+def estimate_cube_bytes(df):
+    # what build_sales_cube(df) keeps at least: a byte per cell for sales and counts and four
+    # for each prefix sum, for the whole frame and again for every site
+    cells = df['Menu Item'].nunique() * df['Date'].nunique() * df['MealType'].nunique()
+    sites = df['Site'].nunique() if 'Site' in df.columns else 0
+    return cells * (1 + 1 + 4 + 4) * (1 + sites)
+
+def factorize_labels(series):
+    # like pd.factorize (codes in order of first appearance), but reads a categorical's own
+    # codes so only one int64 array is allocated
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = pd.factorize(series)
+        return codes.astype(np.int64, copy=False), labels.tolist()
+    codes = series.cat.codes.to_numpy()
+    used = pd.unique(codes)
+    lookup = np.zeros(len(series.cat.categories), dtype=np.int64)
+    lookup[used] = np.arange(len(used))
+    return lookup[codes], series.cat.categories[used].tolist()
+
+def build_sales_cube(df):
+    # works in the smallest dtypes that hold the data and frees each per-row temporary as soon
+    # as it's folded in, so building the cube doesn't need several times the frame's memory
+    valid = df['Date'].notna() & df['Menu Item'].notna() & df['MealType'].notna()
+    data = df if valid.all() else df[valid]
+
+    item_codes, items = factorize_labels(data['Menu Item'])
+    
+    dates = data['Date'].to_numpy().astype('datetime64[D]')
+    if len(dates) and np.all(dates[1:] >= dates[:-1]):
+        # already sorted by load_data(), so days are just the runs of equal dates
+        new_day = np.empty(len(dates), dtype=bool)
+        new_day[0] = True
+        np.not_equal(dates[1:], dates[:-1], out=new_day[1:])
+        days = dates[new_day]
+        day_codes = np.cumsum(new_day) - 1
+        del new_day
+    else:
+        days, day_codes = np.unique(dates, return_inverse=True)
+    del dates
+
+    # flat cell index, built in place in the item codes' buffer
+    cells = item_codes
+    cells *= len(days)
+    cells += day_codes
+    del item_codes, day_codes
+    service_codes, services = factorize_labels(data['MealType'])
+    shape = (len(items), len(days), len(services))
+    cells *= len(services)
+    cells += service_codes
+    del service_codes
+
+    quantity = data['Quantity'].to_numpy(dtype=np.float64, na_value=np.nan)
+    has_quantity = ~np.isnan(quantity)
+    if not has_quantity.all():
+        cells, quantity = cells[has_quantity], quantity[has_quantity]
+    size = int(np.prod(shape))
+
+    counts = np.bincount(cells, minlength=size)
+    counts = counts.astype(smallest_int_dtype(counts), copy=False).reshape(shape)
+    sales = np.bincount(cells, weights=quantity, minlength=size)
+    del cells, quantity
+
+    # keep whole-number sales as integers so reports don't print "12.0 units"
+    if pd.api.types.is_integer_dtype(data['Quantity'].dtype) or np.all(np.mod(sales, 1) == 0):
+        sales = sales.astype(smallest_int_dtype(sales), copy=False)
+    sales = sales.reshape(shape)
+
+    cube = SalesCube(items, days, services, sales, counts)
+    
+    # multi-site frames also get one cube per site, for site filters and per-site breakdowns
+    if 'Site' in data.columns:
+        site_rows = data.groupby('Site', observed=True, sort=False).indices
+        cube.sites = {site: build_sales_cube(data.iloc[rows].drop(columns='Site')) for site, rows in site_rows.items()}
+    return cube
+
+def select_site(cube, site):
+    if site is None: return cube
+    if site not in cube.sites:
+        raise ValueError(f"unknown site '{site}', expected one of: {', '.join(cube.sites) or 'none loaded'}")
+    return cube.sites[site]
+
+# metric -> (column heading, printf format, scale applied before formatting)
+RANKINGS = {
+    "total": ("total units", "%10.0f", 1),
+    "daily_mean": ("avg. daily", "%10.2f", 1),
+    "lunch_share": ("lunch share", "%11.1f%%", 100),
+    "dinner_share": ("dinner share", "%11.1f%%", 100),
+    "growth": ("growth", "%+11.1f%%", 100),
+}
+
+def rank_scores(cube, lo, hi, rank_by, totals=None, counts=None):
+    # one score per item from the cube's prefix sums, nan where the metric is undefined
+    # (no sales, or nothing to compare against) so those items are never ranked
+    if rank_by not in RANKINGS:
+        raise ValueError(f"unknown ranking '{rank_by}', expected one of: {', '.join(RANKINGS)}")
+    if totals is None: totals, counts = cube.item_totals(lo, hi)
+    total_sales = totals.sum(axis=1)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if rank_by == "total":
+            return total_sales
+        if rank_by == "daily_mean":
+            # units per trading day in the window, lunch and dinner together
+            return np.where(counts.sum(axis=1) == 0, np.nan, total_sales / (hi - lo))
+        if rank_by in ("lunch_share", "dinner_share"):
+            service = cube.service_index.get(MealType.LUNCH if rank_by == "lunch_share" else MealType.DINNER)
+            if service is None: return np.full(len(cube.items), np.nan)
+            return totals[:, service] / np.where(total_sales == 0, np.nan, total_sales)
+        
+        # growth against the same number of trading days just before the window
+        previous_lo = lo - (hi - lo)
+        if previous_lo < 0: return np.full(len(cube.items), np.nan)
+        previous = cube.item_totals(previous_lo, lo)[0].sum(axis=1)
+        return (total_sales - previous) / np.where(previous == 0, np.nan, previous)
+
+def select_ranked(scores, limit, bottom=False):
+    # partial selection: argpartition finds the limit-th best score in linear time and only the
+    # items at least that good get sorted. ties keep item order, like a stable full sort
+    ranked = np.flatnonzero(~np.isnan(scores))
+    keys = scores[ranked] if bottom else -scores[ranked]
+    if 0 < limit < len(ranked):
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        keep = keys <= kth
+        ranked, keys = ranked[keep], keys[keep]
+    return ranked[np.argsort(keys, kind='stable')[:max(limit, 0)]]
+
+def rolling_sums(cube, lo, hi, window, offset=0):
+    # calendar windows of `window` days ending `offset` days before each day in [lo, hi), for
+    # every item at once, by differencing the cube's prefix sums. returns (items x days x
+    # meal types) totals, the trading days each window covers, and whether the window lies
+    # entirely within the recorded history
+    window_ends = cube.days[lo:hi] - np.timedelta64(offset, 'D')
+    window_starts = window_ends - np.timedelta64(window - 1, 'D')
+    starts = np.searchsorted(cube.days, window_starts, side='left')
+    ends = np.searchsorted(cube.days, window_ends, side='right')
+    return cube.window_totals(starts, ends), ends - starts, window_starts >= cube.days[0]
+
+def rolling_metrics(cube, lo, hi, short_window=7, long_window=28):
+    # (items x days) arrays of rolling sums and daily means for both windows, the change on
+    # the previous short window (week over week with the default 7) and the short-window
+    # lunch share. windows that reach back before the first recorded day are nan
+    if short_window < 1 or long_window < 1:
+        raise ValueError(f"rolling windows must be at least 1 day, got {short_window} and {long_window}")
+    metrics = {}
+    for window in (short_window, long_window):
+        totals, covered, complete = rolling_sums(cube, lo, hi, window)
+        sales = totals.sum(axis=2).astype(np.float64)
+        sales[:, ~complete] = np.nan
+        metrics[f"sales_{window}d"] = sales
+        with np.errstate(invalid='ignore', divide='ignore'):
+            metrics[f"mean_{window}d"] = sales / covered
+        if window == short_window:
+            lunch = cube.service_index.get(MealType.LUNCH)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                lunch_sales = totals[:, :, lunch] if lunch is not None else np.zeros_like(sales)
+                metrics[f"lunch_share_{window}d"] = lunch_sales / np.where(sales == 0, np.nan, sales)
+    
+    previous, _, complete = rolling_sums(cube, lo, hi, short_window, offset=short_window)
+    previous = previous.sum(axis=2).astype(np.float64)
+    previous[:, ~complete] = np.nan
+    previous[previous == 0] = np.nan
+    metrics["change"] = metrics[f"sales_{short_window}d"] / previous - 1
+    return metrics
+
+def rolling_frame(cube, start_date=None, end_date=None, short_window=7, long_window=28, site=None):
+    # the rolling metrics as a long frame (one row per item and day), ready for plotting
+    cube = select_site(cube, site)
+    lo, hi = cube.day_bounds(*parse_date_range(start_date, end_date))
+    metrics = rolling_metrics(cube, lo, hi, short_window, long_window)
+    return pd.DataFrame({
+        'Date': np.tile(cube.days[lo:hi], len(cube.items)),
+        'Menu Item': pd.Categorical(np.repeat(np.array(cube.items, dtype=object), hi - lo), categories=cube.items),
+        **{name: values.ravel() for name, values in metrics.items()},
+    })
+
+def parse_date_range(start_date, end_date):
+    if start_date and end_date:
+        return datetime.strptime(start_date, '%d/%m/%Y'), datetime.strptime(end_date, '%d/%m/%Y')
+    return None, None
+
+def format_days(days):
+    return pd.DatetimeIndex(days).strftime('%d/%m/%Y')
+
+def render_table(columns, formats, separator=" | "):
+    # joins the per-column printf-style formats (e.g. "%-12s", "%10.2f") into one row template,
+    # applies it to each row with % and joins the lines once instead of appending them one by one
+    row_format = separator.join(formats)
+    rows = zip(*(np.asarray(values).tolist() for values in columns))
+    table = "\n".join(map(row_format.__mod__, rows))
+    return table + "\n" if table else ""
+
+##################################################################
+# query memoization
+##################################################################
+
+class QueryCache:
+    # bounded lru cache of analysis results, keyed on the normalised query and the cube fingerprint
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            if key in self.entries and self.is_fresh(self.entries[key]):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    
+    @staticmethod
+    def is_fresh(value):
+        # a cached result is only reusable while its graph is still rendering or still on disk
+        _, plot_future = value
+        if plot_future is None or not plot_future.done(): return True
+        if plot_future.exception() is not None: return False
+        return os.path.exists(plot_future.result())
+    
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+query_cache = QueryCache()
+
+def memoize_query(func):
+    signature = inspect.signature(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        fields = {name: value for name, value in bound.arguments.items() if name not in ('df', 'cube')}
+        with tracer.query(func.__name__, **fields):
+            return cached_call(bound, *args, **kwargs)
+    
+    def cached_call(bound, *args, **kwargs):
+        cube = bound.arguments.get('cube')
+        if cube is None:
+            return func(*args, **kwargs)
+        
+        # compare parsed dates rather than the raw strings, so "1/3/2023" and "01/03/2023" share an entry
+        try: start_date, end_date = parse_date_range(bound.arguments.get('start_date'), bound.arguments.get('end_date'))
+        except ValueError: return func(*args, **kwargs)
+        
+        query = tuple((name, value) for name, value in bound.arguments.items() if name not in ('df', 'cube', 'start_date', 'end_date'))
+        key = (func.__name__, query, start_date, end_date, cube.fingerprint)
         
-        daily_sales = item_data.groupby(item_data['Date'].dt.date)['Quantity'].sum().reset_index()
-        daily_sales.columns = ['Date', 'Units Sold']
+        result = query_cache.get(key)
+        tracer.count("query_cache_hit" if result is not None else "query_cache_miss")
+        if result is None:
+            result = func(*args, **kwargs)
+            query_cache.put(key, result)
+        return result
     
-        plt.figure(figsize=(10, 5))
-        plt.plot(daily_sales['Date'], daily_sales['Units Sold'], marker='o')
-        plt.title(f"sales of {menu_item} over time")
-        plt.xlabel('date')
-        plt.ylabel('units sold')
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.tight_layout()
+    return wrapper
+
+##################################################################
+# analysis
+##################################################################
+
+@memoize_query
+def analyze_item_sales(df, menu_item, start_date=None, end_date=None, cube=None, site=None):
+    try:
+        start_date, end_date = parse_date_range(start_date, end_date)
+        if cube is None: cube = build_sales_cube(select_date_range(df, start_date, end_date))
+        cube = select_site(cube, site)
+        lo, hi = cube.day_bounds(start_date, end_date)
+        tracer.lap("filter")
+        
+        if menu_item not in cube.item_index or lo == hi:
+            return f"{Colours.RED}no sales data found for {menu_item} in the selected period.{Colours.RESET}", None
+        
+        days = cube.days[lo:hi]
+        units_sold = cube.daily_sales(lo, hi, menu_item).sum(axis=1)
+        tracer.count("cells_scanned", (hi - lo) * len(cube.services))
+        tracer.lap("aggregate")
     
-        plot_filename = save_plot(plt)
-        plt.close()
+        plot_future = submit_plot({
+            'kind': 'line',
+            'figsize': (10, 5),
+            'x': days,
+            'series': [{'y': units_sold, 'marker': 'o'}],
+            'title': f"sales of {menu_item} over time",
+            'xlabel': 'date',
+            'ylabel': 'units sold',
+            'grid': True,
+        }, cache_key=plot_cache_key(f'item_sales:{site or ""}', menu_item, start_date, end_date, cube.fingerprint))
+        tracer.lap("plot")
     
-        result = f"{Colours.GREEN}sales analysis for {menu_item}{Colours.RESET}\n"
+        result = f"{Colours.GREEN}sales analysis for {menu_item}{f' at {site}' if site else ''}{Colours.RESET}\n"
         result += "-" * 50 + "\n"
-        result += f"total units sold: {item_data['Quantity'].sum()}\n"
-        result += f"average daily sales: {item_data.groupby(item_data['Date'].dt.date)['Quantity'].sum().mean():.2f} units\n"
+        result += f"total units sold: {units_sold.sum()}\n"
+        result += f"average daily sales: {units_sold.mean():.2f} units\n"
         result += "-" * 50 + "\n"
         result += f"{'date':<12} | {'units sold':>10}\n"
         result += "-" * 50 + "\n"
         
-        for _, row in daily_sales.iterrows():
-            result += f"{row['Date'].strftime('%d/%m/%Y'):<12} | {row['Units Sold']:>10}\n"
+        result += render_table([format_days(days).to_numpy(dtype=str), units_sold], ["%-12s", "%10s"])
         
-        return result, plot_filename
+        tracer.lap("render")
+        return result, plot_future
     except Exception as e:
         return f"{Colours.RED}error analyzing item sales: {str(e)}{Colours.RESET}", None
 
-def analyze_meal_trends(df, menu_item=None, start_date=None, end_date=None):
+@memoize_query
+def analyze_meal_trends(df, menu_item=None, start_date=None, end_date=None, cube=None, site=None):
     try:
-        if start_date and end_date:
-            start_date = datetime.strptime(start_date, '%d/%m/%Y')
-            end_date = datetime.strptime(end_date, '%d/%m/%Y')
-            mask = (df['Date'] >= start_date) & (df['Date'] <= end_date)
-            filtered_df = df[mask]
-        else:
-            filtered_df = df
-        
-        if menu_item:
-            filtered_df = filtered_df[filtered_df['Menu Item'] == menu_item]
+        start_date, end_date = parse_date_range(start_date, end_date)
+        if cube is None: cube = build_sales_cube(select_date_range(df, start_date, end_date))
+        cube = select_site(cube, site)
+        lo, hi = cube.day_bounds(start_date, end_date)
+        tracer.lap("filter")
         
-        if filtered_df.empty:
+        if (menu_item and menu_item not in cube.item_index) or lo == hi:
             return f"{Colours.RED}no sales data found for the selected criteria.{Colours.RESET}", None
         
-        meal_trends = filtered_df.groupby([filtered_df['Date'].dt.date, 'MealType'])['Quantity'].sum().reset_index()
-        pivot_df = meal_trends.pivot(index='Date', columns='MealType', values='Quantity').fillna(0)
+        days = cube.days[lo:hi]
+        daily_sales = cube.daily_sales(lo, hi, menu_item or None)
         
-        if MealType.LUNCH not in pivot_df.columns: pivot_df[MealType.LUNCH] = 0
-        if MealType.DINNER not in pivot_df.columns: pivot_df[MealType.DINNER] = 0
+        def service_sales(service):
+            if service not in cube.service_index: return np.zeros(len(days), dtype=daily_sales.dtype)
+            return daily_sales[:, cube.service_index[service]]
         
-        plt.figure(figsize=(12, 6))
-        plt.plot(pivot_df.index, pivot_df[MealType.LUNCH], marker='o', label='Lunch', color='orange')
-        plt.plot(pivot_df.index, pivot_df[MealType.DINNER], marker='s', label='Dinner', color='blue')
+        lunch_sales = service_sales(MealType.LUNCH)
+        dinner_sales = service_sales(MealType.DINNER)
+        tracer.count("cells_scanned", (hi - lo) * len(cube.services) * (1 if menu_item else len(cube.items)))
+        tracer.lap("aggregate")
         
         title = 'lunch v. dinner sales trends'
         if menu_item:
             title += f' for {menu_item}'
+        if site:
+            title += f' at {site}'
             
-        plt.title(title)
-        plt.xlabel('date')
-        plt.ylabel('units Sold')
-        plt.grid(True)
-        plt.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        plot_file = save_plot(plt)
-        plt.close()
+        plot_future = submit_plot({
+            'kind': 'line',
+            'figsize': (12, 6),
+            'x': days,
+            'series': [
+                {'y': lunch_sales, 'marker': 'o', 'label': 'Lunch', 'color': 'orange'},
+                {'y': dinner_sales, 'marker': 's', 'label': 'Dinner', 'color': 'blue'},
+            ],
+            'title': title,
+            'xlabel': 'date',
+            'ylabel': 'units Sold',
+            'grid': True,
+            'legend': True,
+        }, cache_key=plot_cache_key(f'meal_trends:{site or ""}', menu_item, start_date, end_date, cube.fingerprint))
+        tracer.lap("plot")
         
-        lunch_total = filtered_df[filtered_df['MealType'] == MealType.LUNCH]['Quantity'].sum()
-        dinner_total = filtered_df[filtered_df['MealType'] == MealType.DINNER]['Quantity'].sum()
+        lunch_total = lunch_sales.sum()
+        dinner_total = dinner_sales.sum()
         
-        lunch_avg = filtered_df[filtered_df['MealType'] == MealType.LUNCH].groupby(filtered_df['Date'].dt.date)['Quantity'].sum().mean()
-        dinner_avg = filtered_df[filtered_df['MealType'] == MealType.DINNER].groupby(filtered_df['Date'].dt.date)['Quantity'].sum().mean()
+        lunch_avg = lunch_sales.mean() if MealType.LUNCH in cube.service_index else np.nan
+        dinner_avg = dinner_sales.mean() if MealType.DINNER in cube.service_index else np.nan
         
         report_title = 'lunch vs dinner comparison'
         if menu_item:
             report_title += f' for {menu_item}'
+        if site:
+            report_title += f' at {site}'
             
+        first_day, last_day = format_days(days[[0, -1]])
+        
         result = f"{Colours.GREEN}{report_title}{Colours.RESET}\n"
         result += "-" * 50 + "\n"
-        result += f"period: {min(pivot_df.index).strftime('%d/%m/%Y')} to {max(pivot_df.index).strftime('%d/%m/%Y')}\n"
+        result += f"period: {first_day} to {last_day}\n"
         result += "-" * 50 + "\n"
         result += f"{'meal type':<12} | {'total sales':>10} | {'daily average':>15}\n"
         result += "-" * 50 + "\n"
@@ -282,93 +1628,659 @@ def analyze_meal_trends(df, menu_item=None, start_date=None, end_date=None):
         else:
             result += f"{Colours.YELLOW}lunch and dinner services have equal sales{Colours.RESET}\n"
         
-        return result, plot_file
+        tracer.lap("render")
+        return result, plot_future
     except Exception as e:
         return f"{Colours.RED}error analysing meal trends: {str(e)}{Colours.RESET}", None
 
-def find_top_items(df, start_date=None, end_date=None, limit=5):
+def growth_start(df, start_date, end_date):
+    # growth compares against the same number of trading days just before the period, so a
+    # cube built for it has to start that many trading days earlier
+    if start_date is None: return None
+    days = np.unique(select_date_range(df, None, end_date)['Date'].to_numpy())
+    first = np.searchsorted(days, np.datetime64(start_date, 'ns'), side='left')
+    return pd.Timestamp(days[max(0, 2 * first - len(days))])
+
+@memoize_query
+def find_top_items(df, start_date=None, end_date=None, limit=5, cube=None, site=None, by_site=False, rank_by="total", bottom=False):
     try:
+        start_date, end_date = parse_date_range(start_date, end_date)
+        if cube is None: cube = build_sales_cube(select_date_range(df, growth_start(df, start_date, end_date) if rank_by == "growth" else start_date, end_date))
+        cube = select_site(cube, site)
+        lo, hi = cube.day_bounds(start_date, end_date)
+        tracer.lap("filter")
+        
+        if not cube.items or lo == hi:
+            return f"{Colours.RED}no sales data found for the selected period.{Colours.RESET}", None
+        
+        totals, counts = cube.item_totals(lo, hi)
+        total_sales = totals.sum(axis=1)
+        avg_daily_sales = rank_scores(cube, lo, hi, "daily_mean", totals, counts)
+        
+        scores = rank_scores(cube, lo, hi, rank_by, totals, counts)
+        top = select_ranked(scores, limit, bottom)
+        if len(top) == 0:
+            if rank_by == "growth":
+                return f"{Colours.RED}there's no earlier period of the same length to compare the selected period against.{Colours.RESET}", None
+            return f"{Colours.RED}no items can be ranked by {RANKINGS[rank_by][0]} for the selected period.{Colours.RESET}", None
+        top_items = [cube.items[i] for i in top]
+        tracer.count("cells_scanned", 2 * len(cube.items) * len(cube.services) * (2 if rank_by == "growth" else 1))
+        tracer.lap("aggregate")
+        
+        # per-site units for the chain-wide top items, each site cube answers from its own prefix sums
+        site_sales = {}
+        if by_site and site is None:
+            for site_name, site_cube in cube.sites.items():
+                site_lo, site_hi = site_cube.day_bounds(start_date, end_date)
+                site_totals = site_cube.item_totals(site_lo, site_hi)[0].sum(axis=1)
+                site_sales[site_name] = np.array([site_totals[site_cube.item_index[item]] if item in site_cube.item_index else 0 for item in top_items])
+        
+        if site_sales:
+            plot_spec = {
+                'kind': 'stacked_bar',
+                'figsize': (10, 5),
+                'x': top_items,
+                'series': [{'y': units, 'label': site_name} for site_name, units in site_sales.items()],
+                'title': 'top items by quantity sold, by site',
+                'xlabel': 'menu item',
+                'ylabel': 'total units sold',
+                'legend': True,
+            }
+        elif rank_by == "total" and not bottom:
+            plot_spec = {
+                'kind': 'bar',
+                'figsize': (10, 5),
+                'x': top_items,
+                'series': [{'y': total_sales[top], 'color': 'skyblue'}],
+                'title': 'top items by quantity sold' + (f' at {site}' if site else ''),
+                'xlabel': 'menu item',
+                'ylabel': 'total units sold',
+            }
+        else:
+            label, _, scale = RANKINGS[rank_by]
+            plot_spec = {
+                'kind': 'bar',
+                'figsize': (10, 5),
+                'x': top_items,
+                'series': [{'y': scores[top] * scale, 'color': 'salmon' if bottom else 'skyblue'}],
+                'title': f"{'bottom' if bottom else 'top'} items by {label}" + (f' at {site}' if site else ''),
+                'xlabel': 'menu item',
+                'ylabel': label + (' (%)' if scale != 1 else ''),
+            }
+        plot_kind = f"top_items_{limit}:{site or ''}" + ("_by_site" if site_sales else "")
+        if rank_by != "total" or bottom: plot_kind += f":{rank_by}:{'bottom' if bottom else 'top'}"
+        plot_future = submit_plot(plot_spec, cache_key=plot_cache_key(plot_kind, None, start_date, end_date, cube.fingerprint))
+        tracer.lap("plot")
+        
+        if rank_by == "total" and not bottom:
+            result = f"{Colours.GREEN}top selling menu items analysis{f' at {site}' if site else ''}{Colours.RESET}\n"
+        else:
+            result = f"{Colours.GREEN}{'bottom' if bottom else 'top'} {limit} menu items by {RANKINGS[rank_by][0]}{f' at {site}' if site else ''}{Colours.RESET}\n"
         if start_date and end_date:
-            start_date = datetime.strptime(start_date, '%d/%m/%Y')
-            end_date = datetime.strptime(end_date, '%d/%m/%Y')
-            mask = (df['Date'] >= start_date) & (df['Date'] <= end_date)
-            filtered_df = df[mask]
+            result += f"period: {start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')}\n"
+        result += "-" * 75 + "\n"
+        
+        if rank_by in ("total", "daily_mean"):
+            result += f"{'menu item':<20} | {'total units':>10} | {'avg. daily':>10}\n"
+            result += "-" * 75 + "\n"
+            result += render_table([np.array(top_items, dtype=str), total_sales[top], avg_daily_sales[top]], ["%-20s", "%10.0f", "%10.2f"])
         else:
-            filtered_df = df
+            label, score_format, scale = RANKINGS[rank_by]
+            result += f"{'menu item':<20} | {'total units':>10} | {'avg. daily':>10} | {label:>12}\n"
+            result += "-" * 75 + "\n"
+            result += render_table([np.array(top_items, dtype=str), total_sales[top], avg_daily_sales[top], scores[top] * scale],
+                                   ["%-20s", "%10.0f", "%10.2f", score_format])
         
-        if filtered_df.empty:
-            return f"{Colours.RED}no sales data found for the selected period.{Colours.RESET}", None
+        result += "-" * 75 + "\n"
         
-        item_sales = filtered_df.groupby('Menu Item').agg({
-            'Quantity': ['sum', 'mean'],
-        }).reset_index()
-        item_sales.head()
+        if site_sales:
+            result += f"{'menu item':<20} | " + " | ".join(f"{site_name:>12.12}" for site_name in site_sales) + "\n"
+            result += "-" * 75 + "\n"
+            result += render_table([np.array(top_items, dtype=str)] + list(site_sales.values()), ["%-20s"] + ["%12.0f"] * len(site_sales))
+            result += "-" * 75 + "\n"
         
-        item_sales.columns = ['Menu Item', 'TotalSales', 'AvgDailySales']
-        top_by_quantity = item_sales.sort_values('TotalSales', ascending=False).head(limit)
+        if rank_by == "total" and not bottom:
+            result += f"{Colours.YELLOW}highest sales: {top_items[0]} with {total_sales[top[0]]:.0f} units{Colours.RESET}\n"
+        else:
+            label, score_format, scale = RANKINGS[rank_by]
+            result += f"{Colours.YELLOW}{'lowest' if bottom else 'highest'} {label}: {top_items[0]} with {(score_format % (scores[top[0]] * scale)).strip()}{Colours.RESET}\n"
         
-        plt.figure(figsize=(10, 5))
+        tracer.lap("render")
+        return result, plot_future
+    except Exception as e:
+        return f"{Colours.RED}error finding top items: {str(e)}{Colours.RESET}", None
+
+@memoize_query
+def analyze_rolling_sales(df, menu_item=None, start_date=None, end_date=None, cube=None, site=None, short_window=7, long_window=28):
+    try:
+        if short_window < 1 or long_window < 1:
+            return f"{Colours.RED}rolling windows must be at least 1 day.{Colours.RESET}", None
+        start_date, end_date = parse_date_range(start_date, end_date)
+        if cube is None:
+            # the windows at the start of the period reach back into the days before it
+            lead_in = timedelta(days=max(long_window, 2 * short_window) - 1)
+            cube = build_sales_cube(select_date_range(df, start_date - lead_in if start_date else None, end_date))
+        cube = select_site(cube, site)
+        lo, hi = cube.day_bounds(start_date, end_date)
+        tracer.lap("filter")
         
-        plt.bar(top_by_quantity['Menu Item'], top_by_quantity['TotalSales'], color='skyblue')
-        plt.title('top items by quantity sold')
-        plt.xlabel('menu item')
-        plt.ylabel('total units sold')
-        plt.tick_params(axis='x', rotation=45)
+        if (menu_item and menu_item not in cube.item_index) or lo == hi:
+            return f"{Colours.RED}no sales data found for the selected criteria.{Colours.RESET}", None
         
-        plt.tight_layout()
+        # windows reach back before the selected period, so only the cube is narrowed to it
+        days = cube.days[lo:hi]
+        metrics = rolling_metrics(cube, lo, hi, short_window, long_window)
+        short_sales, short_mean = metrics[f"sales_{short_window}d"], metrics[f"mean_{short_window}d"]
+        long_mean, lunch_share = metrics[f"mean_{long_window}d"], metrics[f"lunch_share_{short_window}d"]
+        tracer.count("cells_scanned", 3 * (hi - lo) * len(cube.services) * len(cube.items))
+        tracer.lap("aggregate")
         
-        plot_file = save_plot(plt)
-        plt.close()
+        if menu_item:
+            item = cube.item_index[menu_item]
+            short_line, long_line = short_mean[item], long_mean[item]
+        else:
+            # chain-wide daily means are the item means added up
+            short_line, long_line = np.nansum(short_mean, axis=0), np.nansum(long_mean, axis=0)
+            short_line[np.isnan(short_mean).all(axis=0)] = np.nan
+            long_line[np.isnan(long_mean).all(axis=0)] = np.nan
         
-        result = f"{Colours.GREEN}top selling menu items analysis{Colours.RESET}\n"
-        if start_date and end_date:
-            result += f"period: {start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')}\n"
+        title = f'{short_window} and {long_window} day rolling average sales'
+        if menu_item:
+            title += f' for {menu_item}'
+        if site:
+            title += f' at {site}'
+        
+        plot_future = submit_plot({
+            'kind': 'line',
+            'figsize': (12, 6),
+            'x': days,
+            'series': [
+                {'y': short_line, 'marker': None, 'label': f'{short_window} day average', 'color': 'orange'},
+                {'y': long_line, 'marker': None, 'label': f'{long_window} day average', 'color': 'blue'},
+            ],
+            'title': title,
+            'xlabel': 'date',
+            'ylabel': 'units sold per day',
+            'grid': True,
+            'legend': True,
+        }, cache_key=plot_cache_key(f'rolling_{short_window}_{long_window}:{site or ""}', menu_item, start_date, end_date, cube.fingerprint))
+        tracer.lap("plot")
+        
+        first_day, last_day = format_days(days[[0, -1]])
+        
+        result = f"{Colours.GREEN}{title}{Colours.RESET}\n"
         result += "-" * 75 + "\n"
-        result += f"{'menu item':<20} | {'total units':>10} | {'avg. daily':>10}\n"
+        result += f"period: {first_day} to {last_day}\n"
         result += "-" * 75 + "\n"
         
-        for _, row in top_by_quantity.head(limit).iterrows():
-            result += f"{row['Menu Item']:<20} | {row['TotalSales']:>10.0f} | {row['AvgDailySales']:>10.2f}\n"
+        if menu_item:
+            result += f"{'date':<12} | {f'{short_window}d units':>10} | {f'{short_window}d avg.':>10} | {f'{long_window}d avg.':>10} | {'change':>8} | {'lunch':>7}\n"
+            result += "-" * 75 + "\n"
+            result += render_table([format_days(days), short_sales[item], short_mean[item], long_mean[item], metrics["change"][item] * 100, lunch_share[item] * 100],
+                                   ["%-12s", "%10.0f", "%10.2f", "%10.2f", "%+7.1f%%", "%6.1f%%"])
+        else:
+            # every item as of the last day of the period, fastest growing first
+            last = hi - lo - 1
+            order = np.argsort(-np.nan_to_num(metrics["change"][:, last], nan=-np.inf), kind='stable')
+            result += f"as of {last_day}\n"
+            result += f"{'menu item':<20} | {f'{short_window}d units':>10} | {f'{short_window}d avg.':>10} | {f'{long_window}d avg.':>10} | {'change':>8} | {'lunch':>7}\n"
+            result += "-" * 75 + "\n"
+            result += render_table([np.array(cube.items, dtype=str)[order], short_sales[order, last], short_mean[order, last], long_mean[order, last],
+                                    metrics["change"][order, last] * 100, lunch_share[order, last] * 100],
+                                   ["%-20s", "%10.0f", "%10.2f", "%10.2f", "%+7.1f%%", "%6.1f%%"])
         
         result += "-" * 75 + "\n"
-        result += f"{Colours.YELLOW}highest sales: {top_by_quantity.iloc[0]['Menu Item']} with {top_by_quantity.iloc[0]['TotalSales']:.0f} units{Colours.RESET}\n"
+        result += f"{Colours.YELLOW}change compares each {short_window} day window with the {short_window} days before it{Colours.RESET}\n"
         
-        return result, plot_file
+        tracer.lap("render")
+        return result, plot_future
     except Exception as e:
-        return f"{Colours.RED}error finding top items: {str(e)}{Colours.RESET}", None
+        return f"{Colours.RED}error analysing rolling sales: {str(e)}{Colours.RESET}", None
+
+##################################################################
+# batch mode
+##################################################################
+
+ANALYSES = {
+    "item_sales": lambda df, cube, job: analyze_item_sales(df, job["item"], job.get("start"), job.get("end"), cube=cube, site=job.get("site")),
+    "meal_trends": lambda df, cube, job: analyze_meal_trends(df, job.get("item"), job.get("start"), job.get("end"), cube=cube, site=job.get("site")),
+    "top_items": lambda df, cube, job: find_top_items(df, job.get("start"), job.get("end"), limit=job.get("limit", 5), cube=cube,
+                                                      site=job.get("site"), by_site=job.get("by_site", False),
+                                                      rank_by=job.get("rank_by", "total"), bottom=job.get("bottom", False)),
+    "rolling": lambda df, cube, job: analyze_rolling_sales(df, job.get("item"), job.get("start"), job.get("end"), cube=cube, site=job.get("site"),
+                                                           short_window=job.get("short_window", 7), long_window=job.get("long_window", 28)),
+}
+
+# job keys an analysis can't run without
+REQUIRED_JOB_KEYS = {"item_sales": ("item",)}
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+
+def load_jobs(filename, items):
+    # a job file is a json list of {"analysis", "item", "start", "end", "limit", "site", "by_site", "rank_by", "bottom",
+    # "short_window", "long_window", "name"} objects.
+    # "item": "*" expands into one job per menu item
+    with open(filename) as f:
+        raw_jobs = json.load(f)
+    
+    if not isinstance(raw_jobs, list):
+        raise ValueError("expected a json list of jobs")
+    
+    jobs = []
+    for n, job in enumerate(raw_jobs, 1):
+        if not isinstance(job, dict):
+            raise ValueError(f"job {n} isn't a json object")
+        if job.get("analysis") not in ANALYSES:
+            raise ValueError(f"job {n}: unknown analysis '{job.get('analysis')}', expected one of: {', '.join(ANALYSES)}")
+        missing = [key for key in REQUIRED_JOB_KEYS.get(job["analysis"], ()) if not job.get(key)]
+        if missing:
+            raise ValueError(f"job {n}: {job['analysis']} needs {', '.join(repr(key) for key in missing)}")
+        if job.get("item") == "*":
+            jobs.extend({**job, "item": item, "name": None} for item in items)
+        else:
+            jobs.append(dict(job))
+    
+    # names become file names in the output directory, so supplied ones are slugified too
+    for i, job in enumerate(jobs):
+        if job.get("name"):
+            job["name"] = slugify(job["name"]) or f"{i + 1:03d}_{job['analysis']}"
+        else:
+            job["name"] = f"{i + 1:03d}_{job['analysis']}_{slugify(job.get('item') or 'all')}"
+    return jobs
+
+def run_job(df, cube, job, output_dir):
+    result, plot_future = ANALYSES[job["analysis"]](df, cube, job)
+    
+    with open(os.path.join(output_dir, f"{job['name']}.txt"), "w") as f:
+        f.write(strip_colours(result))
+    
+    plot_file = wait_for_plot(plot_future) if plot_future else None
+    if plot_file:
+        shutil.copyfile(plot_file, os.path.join(output_dir, f"{job['name']}.png"))
+    return job["name"], plot_file is not None
+
+def run_batch(df, cube, jobs, output_dir, workers=4):
+    # the analyses run on a thread pool while their plots render on the process pool,
+    # so the data is loaded once and shared by every job
+    os.makedirs(output_dir, exist_ok=True)
+    # a job that fails is reported and skipped, the rest of the batch still runs
+    failed = 0
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        job_futures = [pool.submit(run_job, df, cube, job, output_dir) for job in jobs]
+        for job, future in zip(jobs, job_futures):
+            try:
+                name, has_plot = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{Colours.RED} • {job['name']} failed: {e}{Colours.RESET}")
+                continue
+            print(f" • {name}" + (" (+ graph)" if has_plot else ""))
+    print(f"{Colours.GREEN}wrote {len(jobs) - failed} reports to '{output_dir}'{Colours.RESET}")
+    if failed: print(f"{Colours.RED}{failed} of {len(jobs)} jobs failed{Colours.RESET}")
+    stats = query_cache.stats()
+    print(f"query cache: {stats['hits']} hits, {stats['misses']} misses")
+
+##################################################################
+# query server
+##################################################################
+
+SERVER_PORT = 8750
+PLOT_NAME = re.compile(r"plot_[0-9a-f]+\.png")
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class SalesServer:
+    # serves the analyses over http from one loaded session, so every client shares the same
+    # frame, cube, query cache and plot workers. analyses run on a thread pool and plots on
+    # the process pool, so the event loop only ever waits on futures
+    def __init__(self, session, workers=8):
+        self.session = session
+        self.pool = futures.ThreadPoolExecutor(max_workers=workers)
+        self.load_lock = threading.Lock()
+        self.plots = {}
+    
+    def load(self):
+        with self.load_lock:
+            df, cube = self.session.get()
+        if df is None and cube is None:
+            raise LookupError("couldn't load the data")
+        return df, cube
+    
+    def labels(self):
+        with self.load_lock:
+            labels = self.session.labels()
+        if labels is None:
+            raise LookupError("couldn't load the data")
+        return labels
+    
+    def run(self, job):
+        df, cube = self.load()
+        return ANALYSES[job["analysis"]](df, cube, job)
+    
+    def track_plot(self, plot_future):
+        # lets /plots/<name> wait for a render that is still running
+        name = os.path.basename(plot_future.filename)
+        self.plots[name] = plot_future
+        plot_future.add_done_callback(lambda _: self.plots.pop(name, None))
+        return name
+    
+    async def route(self, method, target):
+        if method != "GET":
+            return 405, "application/json", {"error": f"method {method} not allowed"}
+        
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        loop = asyncio.get_running_loop()
+        
+        if url.path == "/items":
+            return 200, "application/json", await loop.run_in_executor(self.pool, self.labels)
+        
+        if url.path == "/stats":
+            return 200, "application/json", {"query_cache": query_cache.stats(), "plots_rendering": len(self.plots)}
+        
+        if url.path.startswith("/plots/"):
+            name = url.path.removeprefix("/plots/")
+            if not PLOT_NAME.fullmatch(name):
+                return 404, "application/json", {"error": f"no plot '{name}'"}
+            plot_future = self.plots.get(name)
+            if plot_future is not None:
+                try: await asyncio.wrap_future(plot_future)
+                except Exception as e: return 500, "application/json", {"error": f"error generating graph: {e}"}
+            try:
+                with open(os.path.join(plot_cache.directory, name), "rb") as f:
+                    return 200, "image/png", f.read()
+            except OSError:
+                return 404, "application/json", {"error": f"no plot '{name}'"}
+        
+        analysis = url.path.strip("/").replace("-", "_")
+        if analysis not in ANALYSES:
+            return 404, "application/json", {"error": f"unknown endpoint '{url.path}'"}
+        
+        job = {"analysis": analysis, "item": params.get("item"), "start": params.get("start"), "end": params.get("end"),
+               "limit": int(params.get("limit", 5)), "site": params.get("site"),
+               "by_site": params.get("by_site", "0").lower() in ("1", "true", "yes"),
+               "rank_by": params.get("rank_by", "total"), "bottom": params.get("bottom", "0").lower() in ("1", "true", "yes"),
+               "short_window": int(params.get("short_window", 7)), "long_window": int(params.get("long_window", 28))}
+        if job["short_window"] < 1 or job["long_window"] < 1:
+            raise ValueError("short_window and long_window must be at least 1")
+        missing = [key for key in REQUIRED_JOB_KEYS.get(analysis, ()) if not job[key]]
+        if missing:
+            raise ValueError(f"{url.path} needs {', '.join(missing)}")
+        result, plot_future = await loop.run_in_executor(self.pool, self.run, job)
+        if params.get("colour", "0") != "1": result = strip_colours(result)
+        return 200, "application/json", {"report": result, "plot": f"/plots/{self.track_plot(plot_future)}" if plot_future else None}
+    
+    async def handle(self, reader, writer):
+        started = time.perf_counter()
+        path = "?"
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""): pass
+            method, target, _ = request_line.split(" ", 2)
+            path = urllib.parse.urlsplit(target).path
+            status, content_type, body = await self.route(method, target)
+        except LookupError as e:
+            status, content_type, body = 503, "application/json", {"error": str(e)}
+        except ValueError as e:
+            status, content_type, body = 400, "application/json", {"error": f"bad request: {e}"}
+        except Exception as e:
+            # anything else is a bug, but the client still gets an answer rather than a dropped connection
+            status, content_type, body = 500, "application/json", {"error": f"{type(e).__name__}: {e}"}
+        
+        if content_type == "application/json": body = json.dumps(body).encode()
+        writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        try: await writer.drain()
+        except ConnectionError: pass
+        writer.close()
+        # requests interleave on this thread, so they're traced as one span each rather than as queries
+        if tracer.enabled: tracer.add_time(f"http {path} {status}", time.perf_counter() - started)
+
+def serve(session, host="127.0.0.1", port=SERVER_PORT, workers=8):
+    server = SalesServer(session, workers=workers)
+    
+    # load up front so the first client doesn't pay for it
+    try: server.load()
+    except LookupError as e:
+        print(f"{Colours.RED}{e}{Colours.RESET}")
+        return
+    
+    async def run():
+        listener = await asyncio.start_server(server.handle, host, port)
+        print(f"{Colours.GREEN}serving sales analyses on http://{host}:{port}{Colours.RESET}")
+        async with listener:
+            await listener.serve_forever()
+    asyncio.run(run())
+
+class RemoteSession:
+    # talks to a running `serve` instead of loading the data, with the same items()/run()
+    # as SalesSession so the menu works against either
+    def __init__(self, url, timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+    
+    def fetch(self, path, params=None):
+        query = urllib.parse.urlencode({k: v for k, v in (params or {}).items() if v is not None})
+        with urllib_request.urlopen(f"{self.url}{path}" + (f"?{query}" if query else ""), timeout=self.timeout) as response:
+            return response.read()
+    
+    def items(self):
+        try: return json.loads(self.fetch("/items"))["items"]
+        except OSError as e:
+            print(f"{Colours.RED}couldn't reach the server at {self.url}: {e}{Colours.RESET}")
+            return None
+    
+    def run(self, job):
+        params = {key: value for key, value in job.items() if key != "analysis"}
+        params.update({key: int(value) for key, value in params.items() if isinstance(value, bool)})
+        params["colour"] = "1" if Colours.GREEN else "0"
+        try: response = json.loads(self.fetch("/" + job["analysis"].replace("_", "-"), params))
+        except OSError as e: return f"{Colours.RED}couldn't reach the server at {self.url}: {e}{Colours.RESET}", None
+        
+        if not response["plot"]:
+            return response["report"], None
+        # plot names are content addressed, so a copy we already have is the same graph
+        plot_file = os.path.join(plot_cache.directory, os.path.basename(response["plot"]))
+        if not os.path.exists(plot_file):
+            try: png = self.fetch(response["plot"])
+            except OSError as e:
+                print(f"{Colours.RED}error generating graph: {e}{Colours.RESET}")
+                return response["report"], None
+            os.makedirs(plot_cache.directory, exist_ok=True)
+            tmp_filename = f"{plot_file}.{os.getpid()}.tmp"
+            with open(tmp_filename, "wb") as f: f.write(png)
+            os.replace(tmp_filename, plot_file)
+        return response["report"], completed_plot(plot_file)
+
+##################################################################
+# startup timing
+##################################################################
+
+# modules that must not be imported before the menu is shown
+DEFERRED_MODULES = ["numpy", "pandas", "matplotlib"]
+
+def startup_report(top=10):
+    # re-imports this module in a fresh interpreter with -X importtime and summarises the
+    # slowest imports. returns 1 if any deferred module got imported eagerly, 0 otherwise
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    check = f"import sys, {module_name}; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules and type(sys.modules[m]).__name__ != '_LazyModule'))"
+    
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", check], cwd=module_dir, capture_output=True, text=True)
+    wall_time = time.perf_counter() - started
+    
+    imports = []
+    for line in process.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), int(parts[0]), parts[2].rstrip()))
+    eager = [name for name in process.stdout.strip().split(",") if name]
+    
+    result = f"{Colours.GREEN}startup import breakdown{Colours.RESET}\n"
+    result += "-" * 75 + "\n"
+    result += f"{'module':<45} | {'self (ms)':>10} | {'total (ms)':>10}\n"
+    result += "-" * 75 + "\n"
+    for cumulative, own, name in sorted(imports, reverse=True)[:top]:
+        result += f"{name:<45.45} | {own / 1000:>10.1f} | {cumulative / 1000:>10.1f}\n"
+    result += "-" * 75 + "\n"
+    result += f"interpreter start + import: {wall_time * 1000:.0f} ms\n"
+    if eager:
+        result += f"{Colours.RED}imported before they were needed: {', '.join(eager)}{Colours.RESET}\n"
+    else:
+        result += f"{Colours.GREEN}{', '.join(DEFERRED_MODULES)} are all deferred{Colours.RESET}\n"
+    print(result)
+    return 1 if eager or process.returncode else 0
 
 ##################################################################
 # main function
 ##################################################################
 
-def main():
-    df = load_data()
-    if df is None:
+def window_days(value):
+    days = int(value)
+    if days < 1: raise argparse.ArgumentTypeError(f"must be at least 1 day, got {value}")
+    return days
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="gurreb's bbq sales analysis")
+    parser.add_argument("--data", default="Task4a_data.csv", help="wide sales csv to load")
+    parser.add_argument("--sites", help="directory or glob of per-site csvs to load in parallel instead of --data")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="answer queries from the in-memory cube or from an indexed sqlite file next to --data")
+    parser.add_argument("--memory-budget", help="stream the csv within this much memory, e.g. 512M")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the on-disk data cache")
+    parser.add_argument("--plain", action="store_true", help="plain output without ansi colours (also set by NO_COLOR)")
+    parser.add_argument("--trace", nargs="?", const="stderr", help="print per-query timings, or append them as json lines to a file (also set by SALES_TRACE)")
+    parser.add_argument("--connect", metavar="URL", help="run the menu and analyses against a running `serve`, e.g. http://127.0.0.1:8750")
+    
+    commands = parser.add_subparsers(dest="command")
+    
+    item_sales = commands.add_parser("item-sales", help="sales data for a specific menu item")
+    item_sales.add_argument("--item", required=True)
+    
+    meal_trends = commands.add_parser("meal-trends", help="lunch vs dinner trends")
+    meal_trends.add_argument("--item")
+    
+    top_items = commands.add_parser("top-items", help="top selling menu items")
+    top_items.add_argument("--limit", type=int, default=5)
+    top_items.add_argument("--by-site", action="store_true", help="break the top items down by site")
+    top_items.add_argument("--rank-by", choices=RANKINGS, default="total", help="what to rank the items by")
+    top_items.add_argument("--bottom", action="store_true", help="list the lowest ranked items instead")
+    
+    rolling = commands.add_parser("rolling", help="rolling sales, week over week change and lunch share")
+    rolling.add_argument("--item")
+    rolling.add_argument("--short-window", type=window_days, default=7, help="days in the short window")
+    rolling.add_argument("--long-window", type=window_days, default=28, help="days in the long window")
+    
+    for command in (item_sales, meal_trends, top_items, rolling):
+        command.add_argument("--start", help="start date (DD/MM/YYYY)")
+        command.add_argument("--end", help="end date (DD/MM/YYYY)")
+        command.add_argument("--site", help="only include this site (with --sites)")
+    
+    batch = commands.add_parser("batch", help="run every analysis in a json job file")
+    batch.add_argument("jobs", help="json list of jobs")
+    batch.add_argument("--output", default="reports", help="directory to write reports and graphs to")
+    batch.add_argument("--workers", type=int, default=4)
+    
+    serve_parser = commands.add_parser("serve", help="load the data once and serve the analyses over http")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    serve_parser.add_argument("--workers", type=int, default=8, help="threads running analyses")
+    
+    commands.add_parser("memory-report", help="compare memory usage of the plain and compact frames")
+    commands.add_parser("startup-report", help="show where the time goes when importing this program")
+    
+    args = parser.parse_args(argv)
+    if args.backend == "sqlite" and args.sites:
+        # the sqlite store is imported from a single csv, it has no per-site tables
+        parser.error("--sites only works with --backend memory")
+    return args
+
+def job_from_args(args):
+    return {"analysis": args.command.replace("-", "_"), "item": getattr(args, "item", None),
+            "start": args.start, "end": args.end, "limit": getattr(args, "limit", 5),
+            "site": args.site, "by_site": getattr(args, "by_site", False),
+            "rank_by": getattr(args, "rank_by", "total"), "bottom": getattr(args, "bottom", False),
+            "short_window": getattr(args, "short_window", 7), "long_window": getattr(args, "long_window", 28)}
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.plain or os.environ.get("NO_COLOR"): Colours.disable()
+    if args.trace: tracer.configure(args.trace)
+    
+    if args.command == "memory-report":
+        print(memory_report(args.data))
+        return
+    if args.command == "startup-report":
+        sys.exit(startup_report())
+    
+    if args.connect:
+        session = RemoteSession(args.connect)
+        if args.command is None:
+            run_menu(session)
+        elif args.command in ("serve", "batch"):
+            print(f"{Colours.RED}'{args.command}' needs the data loaded locally, drop --connect{Colours.RESET}")
+        else:
+            result, plot_future = session.run(job_from_args(args))
+            print(result if sys.stdout.isatty() else strip_colours(result))
+            plot_file = wait_for_plot(plot_future) if plot_future else None
+            if plot_file: print(f"graph saved as '{plot_file}'")
+        return
+    
+    session = SalesSession(args.data, use_cache=not args.no_cache, memory_budget=args.memory_budget, sites=args.sites, backend=args.backend)
+    if args.command is None:
+        run_menu(session)
+        return
+    if args.command == "serve":
+        serve(session, args.host, args.port, args.workers)
+        return
+    
+    df, cube = session.get()
+    if df is None and cube is None:
         print("couldn't load the data. exiting.")
         return
-        
+    
+    if args.command == "batch":
+        try: jobs = load_jobs(args.jobs, session.items())
+        except (OSError, ValueError) as e:
+            print(f"{Colours.RED}couldn't read the jobs in '{args.jobs}': {e}{Colours.RESET}")
+            return
+        run_batch(df, cube, jobs, args.output, args.workers)
+    else:
+        result, plot_future = ANALYSES[args.command.replace("-", "_")](df, cube, job_from_args(args))
+        print(result if sys.stdout.isatty() else strip_colours(result))
+        plot_file = wait_for_plot(plot_future) if plot_future else None
+        if plot_file: print(f"graph saved as '{plot_file}'")
+
+def run_menu(session):
+    # the session is either loaded in this process or a RemoteSession talking to `serve`,
+    # the menu only needs its item list and run(), which returns the report and a plot future
     while True:
         main_menu_choice = main_menu()
         
         if main_menu_choice == MainMenuChoice.EXIT:
             print(" • exiting, goodbye!")
             break
+        
+        # the data (and pandas) are only loaded once an analysis actually needs them
+        menu_items = session.items()
+        if menu_items is None:
+            print("couldn't load the data. exiting.")
+            return
             
         elif main_menu_choice == MainMenuChoice.ITEM_SALES:
-            menu_item = get_menu_items(df)
+            menu_item = get_menu_items(menu_items)
             if menu_item is None:
                 continue
             
             start_date, end_date = get_date_range_input()
-            result, plot_file = analyze_item_sales(df, menu_item, start_date, end_date)
+            result, plot_future = session.run({"analysis": "item_sales", "item": menu_item, "start": start_date, "end": end_date})
             
             print("\n" + result)
+            plot_file = wait_for_plot(plot_future) if plot_future else None
             if plot_file:
                 print(f"\n{Colours.BLUE}a graph has been generated and saved as '{plot_file}'{Colours.RESET}")
             input(f"\npress {Colours.GREEN}Enter{Colours.RESET} to continue...")
-            
-            if plot_file and os.path.exists(plot_file):
-                os.remove(plot_file)
                 
         elif main_menu_choice == MainMenuChoice.MEAL_TRENDS:
             display_header("lunch v. dinner analysis")
@@ -383,33 +2295,55 @@ def main():
                 
             menu_item = None
             if choice == "1":
-                menu_item = get_menu_items(df)
+                menu_item = get_menu_items(menu_items)
                 if menu_item is None:
                     continue
                     
             start_date, end_date = get_date_range_input()
-            result, plot_file = analyze_meal_trends(df, menu_item, start_date, end_date)
+            result, plot_future = session.run({"analysis": "meal_trends", "item": menu_item, "start": start_date, "end": end_date})
             
             print("\n" + result)
+            plot_file = wait_for_plot(plot_future) if plot_future else None
             if plot_file:
                 print(f"\n{Colours.BLUE}a graph has been generated and saved as '{plot_file}'{Colours.RESET}")
             input(f"\npress {Colours.GREEN}Enter{Colours.RESET} to continue...")
-            
-            if plot_file and os.path.exists(plot_file):
-                os.remove(plot_file)
                 
         elif main_menu_choice == MainMenuChoice.TOP_ITEMS:
             display_header("top selling menu items")
             start_date, end_date = get_date_range_input()
-            result, plot_file = find_top_items(df, start_date, end_date)
+            result, plot_future = session.run({"analysis": "top_items", "start": start_date, "end": end_date})
             
             print("\n" + result)
+            plot_file = wait_for_plot(plot_future) if plot_future else None
             if plot_file:
                 print(f"\n{Colours.BLUE}a graph has been generated and saved as '{plot_file}'{Colours.RESET}")
             input(f"\npress {Colours.GREEN}Enter{Colours.RESET} to continue...")
+                
+        elif main_menu_choice == MainMenuChoice.ROLLING:
+            display_header("rolling sales and trends")
+            print("1. analyse specific menu item")
+            print("2. analyse all items")
+            print("0. back to main menu")
+            
+            choice = get_validated_input("enter your selection here", ["1", "2", "0"])
             
-            if plot_file and os.path.exists(plot_file):
-                os.remove(plot_file)
+            if choice == "0":
+                continue
+                
+            menu_item = None
+            if choice == "1":
+                menu_item = get_menu_items(menu_items)
+                if menu_item is None:
+                    continue
+                    
+            start_date, end_date = get_date_range_input()
+            result, plot_future = session.run({"analysis": "rolling", "item": menu_item, "start": start_date, "end": end_date})
+            
+            print("\n" + result)
+            plot_file = wait_for_plot(plot_future) if plot_future else None
+            if plot_file:
+                print(f"\n{Colours.BLUE}a graph has been generated and saved as '{plot_file}'{Colours.RESET}")
+            input(f"\npress {Colours.GREEN}Enter{Colours.RESET} to continue...")
 
 if __name__ == "__main__":
     try: main()
@@ -11,6 +11,7 @@ def main_menu():
         print("")
         print("########### Please select an option #############")
         print("### 1. Average Social Media Interaction Data")
+        print("### 2. Exit")
 
         choice = input('Enter your number selction here: ')
 
@@ -65,19 +66,62 @@ def convert_avg_men_coice(avg_men_choice):
     return avg_choice
 
 
-def get_avg_data(avg_choice):
-    
-    df = pd.read_csv("Task4a_data.csv")
-    extract = df.groupby(['Date'], as_index=False) [avg_choice].mean()
+INTERACTION_METRICS = ["Likes", "Shares", "Comments"]
+daily_stats = None
+
+def load_daily_stats(filename="Task4a_data.csv"):
+    # reads the campaign log once and works out the per-day mean, sum and count of every
+    # metric in one grouped pass, every later query is answered from this table
+    global daily_stats
+
+    if daily_stats is None:
+        df = pd.read_csv(filename, usecols=["Date"] + INTERACTION_METRICS)
+        daily_stats = df.groupby(['Date'])[INTERACTION_METRICS].agg(["mean", "sum", "count"])
+        daily_stats["Day"] = pd.to_datetime(daily_stats.index, dayfirst=True)
+
+    return daily_stats
+
+
+def get_date_range():
+    start_date = input('Enter a start date (DD/MM/YYYY), or leave blank for the whole campaign: ').strip()
+    if start_date == "":
+        return None, None
+
+    end_date = input('Enter an end date (DD/MM/YYYY), or leave blank for the last day of the campaign: ').strip()
+    try:
+        start_date = pd.to_datetime(start_date, dayfirst=True)
+        end_date = pd.to_datetime(end_date, dayfirst=True) if end_date != "" else None
+    except ValueError:
+        print("Sorry, that is not a valid date, showing the whole campaign")
+        return None, None
+
+    if end_date is not None and end_date < start_date:
+        print("Sorry, the end date is before the start date, showing the whole campaign")
+        return None, None
+    return start_date, end_date
+
+
+# how each statistic is described above its table
+STAT_LABELS = {"mean": "average number of {}", "sum": "total number of {}", "count": "number of posts with {} recorded"}
+
+def get_avg_data(avg_choice, start_date=None, end_date=None, stat="mean"):
+
+    stats = load_daily_stats()
+    if start_date is not None:
+        stats = stats[stats["Day"] >= start_date]
+    if end_date is not None:
+        stats = stats[stats["Day"] <= end_date]
+
+    extract = pd.DataFrame({"Date": stats.index, avg_choice: stats[(avg_choice, stat)].to_numpy()})
     extract_no_index = extract.to_string(index=False)
     
-    print("Here is the average number of {} each day during the campaign:".format(avg_choice))
+    print("Here is the {} each day during the campaign:".format(STAT_LABELS[stat].format(avg_choice)))
     return extract_no_index
 
 main_menu_choice = main_menu()
-if main_menu_choice == "1":
+while main_menu_choice == "1":
     avg_men_choice = average_menu()
     avg_choice = convert_avg_men_coice(avg_men_choice)
-    print(get_avg_data(avg_choice))
-
-
+    start_date, end_date = get_date_range()
+    print(get_avg_data(avg_choice, start_date, end_date))
+    main_menu_choice = main_menu()
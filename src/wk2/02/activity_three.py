@@ -1,18 +1,23 @@
-import pandas as pd
+import os
+import sys
 
-df = pd.read_csv('./datasets/data.csv')
+import pandas as pd
 
-print(f"found {df.isnull().sum().sum()} missing values")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cleaning import CleaningPipeline, Dedup, Fill, Outliers
 
-df.fillna(df.mean(), inplace=True)
-print("\ndata after filling missing values:\n", df)
+# the exercise table starts below the 6 line contact list at the top of the file
+df = pd.read_csv('./datasets/data.csv', skiprows=6)
 
-mean_duration = df['Duration'].mean()
-for i in range(len(df)): 
-   if df.loc[i, 'Duration'] > 300: df.loc[i, 'Duration'] = mean_duration
+print(f"found {df.isnull().sum().sum()} missing values")
 
-print("\ndata after fixing outliers in `duration` column:\n", df)
-print(f"found {df.duplicated().sum()} duplicate values")
+# fill gaps with the column means, swap `duration` outliers for the mean, then drop duplicates
+pipeline = CleaningPipeline([
+    Fill(strategy="mean"),
+    Outliers('Duration', upper=300, replace="mean"),
+    Dedup(),
+])
+df = pipeline.run(df)
 
-df.drop_duplicates(inplace=True)
-print("\ndata after removing duplicate values:\n", df)
\ No newline at end of file
+print("\ncleaning steps:\n" + pipeline.format_report())
+print("\ndata after cleaning:\n", df)
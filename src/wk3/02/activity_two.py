@@ -1,16 +1,20 @@
-import pandas as pd 
+import os
+import sys
 
-def process(dataframe):
-    print("processing dataset")
-    print(f"  found {dataframe.duplicated().sum()} duplicates")
-    print(f"  found {dataframe.isnull().sum().sum()} null values")
-    print(dataframe.head())
-    dataframe.drop_duplicates(inplace=True)    
-    dataframe.dropna(inplace=True)
-    return dataframe
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cleaning import CleaningPipeline, Dedup, DropNa, stream_merge
 
-d1f = process(pd.read_csv("./datasets/sdg_index_2000-2022_cp.csv"))
-df2 = process(pd.read_csv("./datasets/sdg_report_2023(in).csv"))
+# each dataset has its duplicates and nulls dropped on the way into the join, so the
+# joined rows are already clean and get written out as they're produced
+index_pipeline = CleaningPipeline([Dedup(), DropNa()])
+report_pipeline = CleaningPipeline([Dedup(), DropNa()])
 
-df3 = process(pd.merge(df1, df2, on=["country_code", "country"]))
-df3.to_csv("./datasets/out.csv", index=False)
+rows = stream_merge("./datasets/sdg_index_2000-2022_cp.csv", "./datasets/sdg_report_2023(in).csv",
+                    on=["country_code", "country"], destination="./datasets/out.csv",
+                    left_pipeline=index_pipeline, right_pipeline=report_pipeline)
+
+print("processing sdg index")
+print(index_pipeline.format_report())
+print("processing sdg report")
+print(report_pipeline.format_report())
+print(f"wrote {rows} merged rows to ./datasets/out.csv")
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+HEADER = ["Menu Item", "Service", "1/5/2023", "2/5/2023", "3/5/2023"]
+ROWS = [
+    ["Soup", "Lunch", 40, 14, 37],
+    ["Soup", "Dinner", 12, 20, 8],
+    ["Ribs", "Lunch", 5, 9, 11],
+]
+
+def write_csv(path, header, rows):
+    with open(path, "w") as f:
+        f.write(",".join(header) + "\n")
+        for row in rows:
+            f.write(",".join(map(str, row)) + "\n")
+
+@pytest.fixture(autouse=True)
+def isolated_output(tmp_path, monkeypatch):
+    # data caches and rendered graphs go under the test's own directory, not the repo
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(main.plot_cache, "directory", str(tmp_path / "plots"))
+    main.query_cache.clear()
+
+@pytest.fixture
+def sales_csv(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    write_csv(path, HEADER, ROWS)
+    return path
@@ -0,0 +1,32 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+def write_jobs(tmp_path, jobs):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(jobs))
+    return str(path)
+
+def test_load_jobs_rejects_missing_item(tmp_path):
+    with pytest.raises(ValueError, match="job 2: item_sales needs 'item'"):
+        main.load_jobs(write_jobs(tmp_path, [{"analysis": "top_items"}, {"analysis": "item_sales"}]), ["Soup"])
+
+def test_failed_job_doesnt_stop_the_batch(sales_csv, tmp_path, monkeypatch, capsys):
+    df, cube = main.SalesSession(sales_csv).get()
+    monkeypatch.setitem(main.ANALYSES, "meal_trends", lambda df, cube, job: 1 / 0)
+    jobs = main.load_jobs(write_jobs(tmp_path, [{"analysis": "meal_trends"}, {"analysis": "item_sales", "item": "Soup"}]), cube.items)
+    main.run_batch(df, cube, jobs, str(tmp_path / "out"), workers=1)
+
+    output = main.strip_colours(capsys.readouterr().out)
+    assert "001_meal_trends_all failed: division by zero" in output
+    assert "1 of 2 jobs failed" in output
+    assert os.path.exists(tmp_path / "out" / "002_item_sales_soup.txt")
+
+def test_supplied_names_stay_in_the_output_directory(tmp_path):
+    jobs = main.load_jobs(write_jobs(tmp_path, [{"analysis": "rolling", "name": "../escape"}, {"analysis": "rolling", "name": "../"}]), [])
+    assert [job["name"] for job in jobs] == ["escape", "002_rolling"]
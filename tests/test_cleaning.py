@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from cleaning import CleaningPipeline, Dedup, DropNa, Fill, Outliers, stream_merge
+
+def test_row_rules_only_see_kept_rows():
+    df = pd.DataFrame({"a": [np.nan, 2, 3], "b": [1, 1, 2]})
+    expected = df.dropna(subset=["a"]).drop_duplicates(subset=["b"])
+
+    pipeline = CleaningPipeline([DropNa(subset=["a"]), Dedup(subset=["b"])])
+    pd.testing.assert_frame_equal(pipeline.run(df), expected)
+    assert [stat["affected"] for stat in pipeline.stats] == [1, 0]
+
+def test_streamed_dedup_ignores_dropped_rows(tmp_path):
+    source, destination = tmp_path / "in.csv", tmp_path / "out.csv"
+    df = pd.DataFrame({"a": [np.nan, 2, 3, 4], "b": [1, 1, 2, 1]})
+    df.to_csv(source, index=False)
+    expected = df.dropna(subset=["a"]).drop_duplicates(subset=["b"])
+
+    CleaningPipeline([DropNa(subset=["a"]), Dedup(subset=["b"])]).run_csv(source, destination, chunksize=1)
+    pd.testing.assert_frame_equal(pd.read_csv(destination), expected.reset_index(drop=True), check_dtype=False)
+
+def test_outliers_on_missing_column():
+    with pytest.raises(KeyError, match="Duration"):
+        CleaningPipeline([Outliers("Duration", upper=300)]).run(pd.DataFrame({"Age": [25, 30]}))
+
+def test_streamed_chunks_share_dtypes(tmp_path):
+    # the gap in b only shows up in the last chunk, which read_csv would parse as float on its own
+    source, destination = tmp_path / "in.csv", tmp_path / "out.csv"
+    source.write_text("k,b\n1,2\n5,6\n1,2\n7,\n")
+    expected = CleaningPipeline([Dedup(), DropNa()]).run(pd.read_csv(source))
+
+    CleaningPipeline([Dedup(), DropNa()]).run_csv(source, destination, chunksize=2)
+    assert destination.read_text() == expected.to_csv(index=False)
+
+def test_streamed_means_skip_dropped_rows(tmp_path):
+    source, destination = tmp_path / "in.csv", tmp_path / "out.csv"
+    df = pd.DataFrame({"a": [100, 100, 100, 0, np.nan]})
+    df.to_csv(source, index=False)
+    expected = CleaningPipeline([Dedup(), Fill(strategy="mean")]).run(df)
+    assert expected["a"].iloc[-1] == 50
+
+    CleaningPipeline([Dedup(), Fill(strategy="mean")]).run_csv(source, destination, chunksize=2)
+    pd.testing.assert_frame_equal(pd.read_csv(destination), expected.reset_index(drop=True))
+
+def test_stream_merge_matches_pandas(tmp_path):
+    # the larger left file is streamed two rows at a time, with a repeat across chunks and
+    # gaps that only show up in later chunks. the gap in right's keys makes them floats
+    left, right, destination = tmp_path / "left.csv", tmp_path / "right.csv", tmp_path / "out.csv"
+    left.write_text("id,x,y\n1,10,5\n2,20,6\n1,10,5\n3,,7\n4,40,8\n2,20,6\n5,50,\n6,60,9\n")
+    right.write_text("id,z\n1,a\n2,b\n4,c\n4,d\n6,\n,e\n")
+    expected = pd.merge(pd.read_csv(left).drop_duplicates().dropna(), pd.read_csv(right).drop_duplicates().dropna(), on=["id"])
+
+    rows = stream_merge(left, right, on=["id"], destination=destination, chunksize=2)
+    assert rows == len(expected) == 4
+    assert destination.read_text() == expected.to_csv(index=False)
+
+def test_stream_merge_matches_text_keys_to_numbers(tmp_path):
+    left, right, destination = tmp_path / "left.csv", tmp_path / "right.csv", tmp_path / "out.csv"
+    left.write_text("code,x\n1,10\n2,20\nA3,30\n2,20\n")
+    right.write_text("code,z\n1,a\n2,b\n")
+
+    assert stream_merge(left, right, on=["code"], destination=destination, chunksize=2) == 2
+    assert destination.read_text() == "code,x,z\n1,10,a\n2,20,b\n"
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+from conftest import HEADER, ROWS, write_csv
+
+def quantity(df, item, service, day):
+    rows = df[(df['Menu Item'] == item) & (df['MealType'] == service) & (df['Date'] == main.pd.Timestamp(day))]
+    return rows['Quantity'].iloc[0]
+
+def test_append_extends_cached_frame(sales_csv):
+    main.load_data(sales_csv)
+    write_csv(sales_csv, HEADER + ["4/5/2023"], [row + [i + 1] for i, row in enumerate(ROWS)])
+
+    df = main.load_data(sales_csv)
+    assert quantity(df, "Ribs", "Lunch", "2023-05-04") == 3
+    assert quantity(df, "Soup", "Lunch", "2023-05-01") == 40
+
+@pytest.mark.parametrize("memory_budget", [None, "1K"])
+def test_edit_plus_append_reparses(sales_csv, memory_budget):
+    main.load_data(sales_csv, memory_budget=memory_budget)
+    edited = [row + [i + 1] for i, row in enumerate(ROWS)]
+    edited[0][2] = 999
+    write_csv(sales_csv, HEADER + ["4/5/2023"], edited)
+
+    cached = main.load_data(sales_csv, memory_budget=memory_budget)
+    fresh = main.load_data(sales_csv, use_cache=False, memory_budget=memory_budget)
+    assert quantity(fresh, "Soup", "Lunch", "2023-05-01") == 999
+    assert quantity(cached, "Soup", "Lunch", "2023-05-01") == 999
+    assert quantity(cached, "Ribs", "Lunch", "2023-05-04") == 3
+
+def test_session_edit_plus_append_reloads(sales_csv):
+    session = main.SalesSession(sales_csv)
+    df, cube = session.get()
+    lo, hi = cube.day_bounds()
+    assert cube.item_totals(lo, hi)[0][cube.item_index["Soup"], cube.service_index["Lunch"]] == 40 + 14 + 37
+
+    edited = [row + [i + 1] for i, row in enumerate(ROWS)]
+    edited[0][2] = 999
+    write_csv(sales_csv, HEADER + ["4/5/2023"], edited)
+    os.utime(sales_csv, ns=(session.last_modified + 1, session.last_modified + 1))
+
+    df, cube = session.get()
+    lo, hi = cube.day_bounds()
+    assert quantity(df, "Soup", "Lunch", "2023-05-01") == 999
+    assert cube.item_totals(lo, hi)[0][cube.item_index["Soup"], cube.service_index["Lunch"]] == 999 + 14 + 37 + 1
+
+def memory_mapped(values):
+    while values is not None:
+        if isinstance(values, main.np.memmap): return True
+        values = values.base
+    return False
+
+@pytest.mark.parametrize("rows", [ROWS, [ROWS[0], ["Ribs", "Lunch", 5, "", 11]]])
+def test_warm_load_maps_the_cache(sales_csv, rows):
+    write_csv(sales_csv, HEADER, rows)
+    cold = main.load_data(sales_csv)
+    warm = main.load_data(sales_csv)
+    main.pd.testing.assert_frame_equal(warm, cold)
+    assert memory_mapped(warm['Menu Item'].array.codes) and memory_mapped(warm['MealType'].array.codes)
+    assert memory_mapped(warm['Date'].to_numpy())
+    quantity = warm['Quantity'].array
+    assert memory_mapped(quantity._data if hasattr(quantity, "_data") else quantity.to_numpy())
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam", "Task4a_data.csv")
+
+def test_rolling_without_cube_matches_shared_cube():
+    df = main.load_data(DATA, use_cache=False)
+    cube = main.build_sales_cube(df)
+    local, _ = main.analyze_rolling_sales(df, "Soup", "1/5/2023", "3/5/2023", short_window=3, long_window=10)
+    shared, _ = main.analyze_rolling_sales(df, "Soup", "1/5/2023", "3/5/2023", cube=cube, short_window=3, long_window=10)
+    assert local == shared
+    assert "nan" not in main.strip_colours(local)
+
+def test_rolling_rejects_empty_windows():
+    df = main.load_data(DATA, use_cache=False)
+    text, plot = main.analyze_rolling_sales(df, "Soup", short_window=0)
+    assert plot is None and "at least 1 day" in text
+
+def test_rolling_frame_matches_rolling_report():
+    df = main.load_data(DATA, use_cache=False)
+    cube = main.build_sales_cube(df)
+    frame = main.rolling_frame(cube, "1/5/2023", "14/5/2023", short_window=3, long_window=10)
+    soup = frame[frame["Menu Item"] == "Soup"]
+    assert len(soup) == 14 and len(frame) == 14 * len(cube.items)
+    
+    text, _ = main.analyze_rolling_sales(df, "Soup", "1/5/2023", "14/5/2023", cube=cube, short_window=3, long_window=10)
+    rows = main.render_table([main.format_days(soup["Date"]), soup["sales_3d"], soup["mean_3d"], soup["mean_10d"], soup["change"] * 100, soup["lunch_share_3d"] * 100],
+                             ["%-12s", "%10.0f", "%10.2f", "%10.2f", "%+7.1f%%", "%6.1f%%"])
+    assert rows in main.strip_colours(text)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam", "Task4a_data.csv")
+DAYS = np.array(["2023-05-01", "2023-05-02", "2023-05-03"], dtype="datetime64[D]")
+
+def test_cube_uses_compact_dtypes():
+    cube = main.build_sales_cube(main.load_data(DATA, use_cache=False))
+    assert cube.sales.dtype == np.int8 and cube.counts.dtype == np.int8
+    assert cube.sales_cumsum.dtype == np.int32 and cube.counts_cumsum.dtype == np.int32
+    assert len(cube.day_buffer) == len(cube.days)
+    assert (cube.sales_cumsum[:, 1:, :] == np.cumsum(cube.sales.astype(np.int64), axis=1)).all()
+
+def test_prefix_sums_widen_instead_of_overflowing():
+    sales = np.full((1, 1, 1), 2**30, dtype=np.int32)
+    counts = np.ones((1, 1, 1), dtype=np.int8)
+    cube = main.SalesCube(["Soup"], DAYS[:1], ["Lunch"], sales, counts)
+    cube.append_days(DAYS[1:2], sales, counts)
+    cube.append_days(DAYS[2:], np.full((1, 1, 1), 0.5), counts)
+    assert cube.sales_cumsum.ravel().tolist() == [0, 2**30, 2**31, 2**31 + 0.5]
+
+def test_session_skips_cube_over_memory_budget():
+    session = main.SalesSession(DATA, use_cache=False, memory_budget="1K")
+    df, cube = session.get()
+    assert cube is None
+    assert session.items() == main.SalesSession(DATA, use_cache=False).items()
+    report, _ = main.analyze_item_sales(df, "Soup", cube=cube)
+    assert "5268" in report
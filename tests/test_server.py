@@ -0,0 +1,47 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+from conftest import HEADER, ROWS, write_csv
+
+async def request(server, target):
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    async with listener:
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname())
+        writer.write(f"GET {target} HTTP/1.1\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    return int(head.split()[1]), json.loads(body)
+
+def test_item_sales_without_item_is_a_bad_request(sales_csv):
+    server = main.SalesServer(main.SalesSession(sales_csv), workers=1)
+    status, body = asyncio.run(request(server, "/item-sales"))
+    assert status == 400 and "item" in body["error"]
+
+def test_unexpected_errors_get_a_response(sales_csv, monkeypatch):
+    server = main.SalesServer(main.SalesSession(sales_csv), workers=1)
+    monkeypatch.setitem(main.ANALYSES, "meal_trends", lambda df, cube, job: 1 / 0)
+    status, body = asyncio.run(request(server, "/meal-trends"))
+    assert status == 500 and "ZeroDivisionError" in body["error"]
+
+def test_appending_days_leaves_the_previous_cube_intact(sales_csv):
+    session = main.SalesSession(sales_csv)
+    df, cube = session.get()
+    days, cumsum = cube.days.copy(), cube.sales_cumsum.copy()
+
+    write_csv(sales_csv, HEADER + ["4/5/2023"], [row + [i + 1] for i, row in enumerate(ROWS)])
+    os.utime(sales_csv, ns=(session.last_modified + 1, session.last_modified + 1))
+    new_df, new_cube = session.get()
+
+    assert new_cube is not cube and len(new_cube.days) == len(days) + 1
+    assert (cube.days == days).all() and (cube.sales_cumsum == cumsum).all()
+    assert len(df) == len(ROWS) * 3 and len(new_df) == len(ROWS) * 4
+
+def test_session_run_returns_the_plot_future(sales_csv):
+    result, plot_future = main.SalesSession(sales_csv).run({"analysis": "item_sales", "item": "Soup"})
+    assert "Soup" in result
+    assert os.path.exists(main.wait_for_plot(plot_future))
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+def test_site_labels_use_file_names():
+    assert main.site_labels(["sites/north.csv", "sites/south.csv"]) == ["north", "south"]
+
+def test_site_labels_keep_same_named_files_apart():
+    labels = main.site_labels(["multi/north/export.csv", "multi/south/export.csv"])
+    assert labels == ["north/export", "south/export"]
+
+def test_sqlite_backend_rejects_sites(capsys):
+    with pytest.raises(SystemExit):
+        main.parse_args(["--backend", "sqlite", "--sites", "multi/*/export.csv", "top-items"])
+    assert "--sites only works with --backend memory" in capsys.readouterr().err
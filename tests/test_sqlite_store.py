@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam", "Task4a_data.csv")
+
+def open_both(tmp_path):
+    store = main.open_sqlite_store(DATA, db_path=str(tmp_path / "sales.sqlite"), use_cache=False)
+    cube = main.build_sales_cube(main.load_data(DATA, use_cache=False))
+    return store, cube
+
+def test_store_queries_match_cube(tmp_path):
+    store, cube = open_both(tmp_path)
+    assert np.array_equal(store.days, cube.days)
+    # the two can number items and meal types differently
+    items = [cube.item_index[item] for item in store.items]
+    services = [cube.service_index[service] for service in store.services]
+
+    for lo, hi in [(0, len(cube.days)), (10, 40), (5, 6), (7, 7)]:
+        assert np.array_equal(store.daily_sales(lo, hi), cube.daily_sales(lo, hi)[:, services])
+        assert np.array_equal(store.daily_sales(lo, hi, "Soup"), cube.daily_sales(lo, hi, "Soup")[:, services])
+        totals, counts = store.item_totals(lo, hi)
+        cube_totals, cube_counts = cube.item_totals(lo, hi)
+        assert np.array_equal(totals, cube_totals[np.ix_(items, services)])
+        assert np.array_equal(counts, cube_counts[np.ix_(items, services)])
+
+    starts, ends = np.array([0, 3, 10, 20]), np.array([7, 10, 38, 21])
+    assert np.array_equal(store.window_totals(starts, ends), cube.window_totals(starts, ends)[items][:, :, services])
+
+def test_store_analyses_match_cube(tmp_path):
+    store, cube = open_both(tmp_path)
+    df = main.load_data(DATA, use_cache=False)
+    analyses = [
+        lambda source: main.analyze_item_sales(df, "Soup", "1/5/2023", "31/5/2023", cube=source),
+        lambda source: main.analyze_meal_trends(df, None, "1/5/2023", "31/5/2023", cube=source),
+        lambda source: main.find_top_items(df, "1/5/2023", "31/5/2023", cube=source),
+        lambda source: main.find_top_items(df, "1/5/2023", "31/5/2023", cube=source, rank_by="growth"),
+        lambda source: main.analyze_rolling_sales(df, "Soup", "1/5/2023", "31/5/2023", cube=source),
+    ]
+    for analysis in analyses:
+        from_store, _ = analysis(store)
+        from_cube, _ = analysis(cube)
+        assert from_store == from_cube
+
+def test_store_path_with_uri_characters(tmp_path):
+    directory = tmp_path / "sales ?#%20"
+    directory.mkdir()
+    source = str(directory / "data.csv")
+    shutil.copy(DATA, source)
+    db_path = str(directory / "data.sqlite")
+    store = main.open_sqlite_store(source, use_cache=False)
+    assert store is not None and len(store.items) > 0
+    # a second open finds the stored hash and reuses the file instead of importing again
+    imported = os.stat(db_path).st_mtime_ns
+    assert main.open_sqlite_store(source, use_cache=False).fingerprint == store.fingerprint
+    assert os.stat(db_path).st_mtime_ns == imported
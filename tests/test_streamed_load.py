@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+HEADER = "Menu Item,Service,1/5/2023,2/5/2023,3/5/2023\n"
+
+@pytest.mark.parametrize("rows", [
+    ["Soup,Lunch,40,14,37", "Ribs,Lunch,5,,11", "Corn,Dinner,2,3,4"],
+    ["Soup,Lunch,40,14,37", "Ribs,Lunch,5,,11", "Corn,Dinner,2.5,3,4"],
+    ["Soup,Lunch,40,14,37", "Ribs,Lunch,5,9,11", "Corn,Dinner,3000000000,3,4"],
+    ["Soup,Lunch,40,14,37", "Ribs,Lunch,5,,11", "Corn,Dinner,-3000000000,3,4"],
+])
+def test_streamed_matches_full_parse(tmp_path, rows):
+    path = tmp_path / "sales.csv"
+    path.write_text(HEADER + "\n".join(rows) + "\n")
+
+    # a tiny budget puts every row in its own chunk, so the odd value arrives after int32 blocks
+    streamed = main.parse_sales_csv_streamed(str(path), "1")
+    full = main.parse_sales_csv(str(path))
+    assert streamed['Quantity'].dtype == full['Quantity'].dtype
+    pd.testing.assert_series_equal(streamed['Quantity'], full['Quantity'])
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam"))
+import main
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "exam", "Task4a_data.csv")
+
+def test_growth_without_cube_matches_shared_cube():
+    df = main.load_data(DATA, use_cache=False)
+    cube = main.build_sales_cube(df)
+    local, _ = main.find_top_items(df, "1/5/2023", "31/5/2023", rank_by="growth")
+    shared, _ = main.find_top_items(df, "1/5/2023", "31/5/2023", rank_by="growth", cube=cube)
+    assert local == shared
+    assert "no earlier period" not in local
+
+def test_top_items_results_are_memoized():
+    df = main.load_data(DATA, use_cache=False)
+    cube = main.build_sales_cube(df)
+    hits = main.query_cache.stats()["hits"]
+    main.find_top_items(df, "1/5/2023", "31/5/2023", cube=cube)
+    main.find_top_items(df, "1/5/2023", "31/5/2023", cube=cube)
+    assert main.query_cache.stats()["hits"] == hits + 1
+
+def test_daily_mean_counts_both_meal_types():
+    days = np.array(["2023-05-01", "2023-05-02"], dtype="datetime64[D]")
+    sales = np.array([[[10, 0], [10, 0]], [[6, 6], [6, 6]]], dtype=np.int8)
+    counts = np.array([[[1, 0], [1, 0]], [[1, 1], [1, 1]]], dtype=np.int8)
+    cube = main.SalesCube(["A", "B"], days, ["Lunch", "Dinner"], sales, counts)
+    assert main.rank_scores(cube, 0, 2, "daily_mean").tolist() == [10, 12]